@@ -0,0 +1,457 @@
+""" Order book engine for the Binance API Client.
+"""
+
+
+from bisect import (
+    bisect_left,
+    bisect_right,
+    insort,
+    )
+import math
+
+from .enums import OrderSides
+
+
+# nudge price / width up before rounding down, so float prices that are
+# an exact multiple of the width land in their own bucket
+BUCKET_EPSILON = 1e-9
+
+
+class SideChanges:
+    """ The levels of one book side changed by an update, as
+    `(price, quantity)` tuples. Removed levels have their last quantity.
+    """
+
+    __slots__ = ('added', 'modified', 'removed')
+
+    def __init__(self):
+        self.added = []
+        self.modified = []
+        self.removed = []
+
+    def __bool__(self):
+        return bool(self.added or self.modified or self.removed)
+
+    def __iter__(self):
+        """ Iterate over the prices of every changed level.
+        """
+
+        for levels in (self.added, self.modified, self.removed):
+            for price, _ in levels:
+                yield price
+
+
+class BookChanges:
+    """ The levels changed by one update of an order book, and whether
+    the best bid or ask (price or quantity) changed.
+    """
+
+    __slots__ = ('bids', 'asks', 'best_bid_changed', 'best_ask_changed')
+
+    def __init__(self, bids, asks, best_bid_changed, best_ask_changed):
+        self.bids = bids
+        self.asks = asks
+        self.best_bid_changed = best_bid_changed
+        self.best_ask_changed = best_ask_changed
+
+    def __bool__(self):
+        return bool(self.bids or self.asks)
+
+    def __repr__(self):
+        return (f'BookChanges(bids={len(self.bids.added)}/{len(self.bids.modified)}'
+                f'/{len(self.bids.removed)}, asks={len(self.asks.added)}'
+                f'/{len(self.asks.modified)}/{len(self.asks.removed)}, '
+                f'top_changed={self.top_changed})')
+
+    @property
+    def top_changed(self):
+        return self.best_bid_changed or self.best_ask_changed
+
+
+class BookSide:
+    """ The price levels on one side of an order book.
+
+    Quantities are kept in a dict keyed by price, and the prices in a
+    sorted list, so a level is found with a binary search and the best
+    `k` levels are a slice of the list. The total quantity and notional
+    (price * quantity) of the side are kept up to date on every change.
+    """
+
+    def __init__(self, descending=False):
+        self.descending = descending
+        self.levels = {}
+        self.prices = []
+        self.quantity = 0
+        self.notional = 0
+        self.buckets = []
+
+    def __len__(self):
+        return len(self.prices)
+
+    def __iter__(self):
+        """ Iterate over `(price, quantity)` levels, best first.
+        """
+
+        prices = reversed(self.prices) if self.descending else self.prices
+        levels = self.levels
+        for price in prices:
+            yield price, levels[price]
+
+    def clear(self):
+        self.levels.clear()
+        self.prices.clear()
+        self.quantity = 0
+        self.notional = 0
+        for buckets in self.buckets:
+            buckets.clear()
+
+    def set(self, price, quantity):
+        """ Set the quantity at `price`; a quantity of 0 removes the
+        level. Return the previous quantity (0 if the level was new).
+        """
+
+        levels = self.levels
+        old_quantity = levels.get(price, 0)
+
+        if quantity:
+            if not old_quantity:
+                insort(self.prices, price)
+            levels[price] = quantity
+        elif old_quantity:
+            del levels[price]
+            del self.prices[bisect_left(self.prices, price)]
+
+        if levels:
+            change = quantity - old_quantity
+            self.quantity += change
+            self.notional += price * change
+        else:
+            # don't let float error build up across empty books
+            self.quantity = self.notional = 0
+
+        if quantity or old_quantity:
+            for buckets in self.buckets:
+                buckets.add(price, old_quantity, quantity)
+
+        return old_quantity
+
+    def apply(self, levels):
+        """ Set `(price, quantity)` levels and return the `SideChanges`.
+        """
+
+        changes = SideChanges()
+        for price, quantity in levels:
+            old_quantity = self.set(price, quantity)
+            if quantity == old_quantity:
+                continue
+            if not old_quantity:
+                changes.added.append((price, quantity))
+            elif quantity:
+                changes.modified.append((price, quantity))
+            else:
+                changes.removed.append((price, old_quantity))
+
+        return changes
+
+    def rank(self, price):
+        """ Return the number of levels better than `price`.
+        """
+
+        if self.descending:
+            return len(self.prices) - bisect_right(self.prices, price)
+        return bisect_left(self.prices, price)
+
+    def best(self):
+        if not self.prices:
+            return None
+
+        price = self.prices[-1] if self.descending else self.prices[0]
+        return price, self.levels[price]
+
+    def top(self, k=None):
+        """ Return the best `k` levels (all if `k` is None) as
+        `(price, quantity)` tuples, best first.
+        """
+
+        if not self.descending:
+            prices = self.prices[:k]
+        elif k is None or k >= len(self.prices):
+            prices = self.prices[::-1]
+        else:
+            prices = self.prices[-1:-k - 1:-1]
+
+        levels = self.levels
+        return [(price, levels[price]) for price in prices]
+
+    def depth(self, k=None):
+        """ Return the total quantity of the best `k` levels.
+        """
+
+        if k is None or k >= len(self.prices):
+            return self.quantity
+
+        return sum(quantity for _, quantity in self.top(k))
+
+    def fill_quantity(self, quantity):
+        """ Return the notional of taking `quantity` from the best levels,
+        or None if the side doesn't hold that much.
+        """
+
+        if quantity > self.quantity:
+            return None
+
+        remaining = quantity
+        notional = 0
+        for price, available in self:
+            if available >= remaining:
+                return notional + price * remaining
+            remaining -= available
+            notional += price * available
+
+        # only reached through float error in the totals
+        return None
+
+    def fill_notional(self, notional):
+        """ Return the quantity bought or sold by spending `notional`
+        on the best levels, or None if the side doesn't hold that much.
+        """
+
+        if notional > self.notional:
+            return None
+
+        remaining = notional
+        quantity = 0
+        for price, available in self:
+            level_notional = price * available
+            if level_notional >= remaining:
+                return quantity + remaining / price
+            remaining -= level_notional
+            quantity += available
+
+        return None
+
+
+class BucketSide(BookSide):
+    """ The levels of one side of a book, grouped into price buckets.
+
+    Levels are keyed by bucket number. The number of book levels in
+    each bucket is counted, so a bucket is removed when its last level
+    is, however much float error its quantity has picked up.
+    """
+
+    def __init__(self, get_bucket, descending=False):
+        super().__init__(descending)
+        self.get_bucket = get_bucket
+        self.counts = {}
+
+    def clear(self):
+        super().clear()
+        self.counts.clear()
+
+    def add(self, price, old_quantity, quantity):
+        """ Apply the change of a book level from `old_quantity` to
+        `quantity`.
+        """
+
+        bucket = self.get_bucket(price)
+        count = self.counts.get(bucket, 0) + bool(quantity) - bool(old_quantity)
+        if count:
+            self.counts[bucket] = count
+            self.set(bucket, self.levels.get(bucket, 0) + quantity - old_quantity)
+        else:
+            self.counts.pop(bucket, None)
+            self.set(bucket, 0)
+
+
+class PriceBuckets:
+    """ An order book aggregated into price buckets of a fixed `width`,
+    or of a fixed `percent` of their price (geometric buckets).
+
+    Once added to a book, the buckets are updated with every level
+    change. Buckets are identified by their lowest price.
+    """
+
+    def __init__(self, width=None, percent=None):
+        if (width is None) == (percent is None):
+            raise ValueError('exactly one of width and percent is required')
+
+        if width is not None:
+            if width <= 0:
+                raise ValueError(f'invalid bucket width: {width}')
+            get_bucket = lambda price: \
+                    math.floor(price / width + BUCKET_EPSILON)
+            self.get_price = lambda bucket: bucket * width
+        else:
+            if percent <= 0:
+                raise ValueError(f'invalid bucket percent: {percent}')
+            ratio = math.log1p(percent / 100)
+            get_bucket = lambda price: \
+                    math.floor(math.log(price) / ratio + BUCKET_EPSILON)
+            self.get_price = lambda bucket: math.exp(bucket * ratio)
+
+        self.width = width
+        self.percent = percent
+        self.bids = BucketSide(get_bucket, descending=True)
+        self.asks = BucketSide(get_bucket)
+
+    def _get_levels(self, side, k):
+        get_price = self.get_price
+        return [(get_price(bucket), quantity) for bucket, quantity in side.top(k)]
+
+    def top(self, k=None):
+        """ Return the best `k` bid and ask buckets as `(price, quantity)`
+        tuples, best first.
+        """
+
+        return self._get_levels(self.bids, k), self._get_levels(self.asks, k)
+
+
+class OrderBook:
+    """ Price-level (L2) order book.
+
+    Prices and quantities can be any ordered numbers, as long as the
+    same representation is used for every update.
+    """
+
+    def __init__(self):
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide()
+
+    def clear(self):
+        self.bids.clear()
+        self.asks.clear()
+
+    def load(self, bids, asks):
+        """ Replace the book with the given `(price, quantity)` levels.
+        """
+
+        self.clear()
+        for price, quantity in bids:
+            self.bids.set(price, quantity)
+        for price, quantity in asks:
+            self.asks.set(price, quantity)
+
+    def apply(self, bids, asks):
+        """ Apply `(price, quantity)` level updates and return the
+        `BookChanges`.
+        """
+
+        best_bid = self.bids.best()
+        best_ask = self.asks.best()
+        bid_changes = self.bids.apply(bids)
+        ask_changes = self.asks.apply(asks)
+
+        return BookChanges(bid_changes, ask_changes,
+                bool(bid_changes) and self.bids.best() != best_bid,
+                bool(ask_changes) and self.asks.best() != best_ask)
+
+    def changes_within(self, changes, k=None):
+        """ Return whether `changes` touched any of the best `k` levels
+        of either side (any level if `k` is None).
+        """
+
+        if k is None:
+            return bool(changes)
+
+        for side, side_changes in ((self.bids, changes.bids),
+                (self.asks, changes.asks)):
+            for price in side_changes:
+                if side.rank(price) < k:
+                    return True
+
+        return False
+
+    def best_bid(self):
+        return self.bids.best()
+
+    def best_ask(self):
+        return self.asks.best()
+
+    def top(self, k=None):
+        return self.bids.top(k), self.asks.top(k)
+
+    def add_buckets(self, buckets):
+        """ Keep `buckets` (`PriceBuckets`) up to date with the book.
+        """
+
+        for side, bucket_side in ((self.bids, buckets.bids),
+                (self.asks, buckets.asks)):
+            bucket_side.clear()
+            for price, quantity in side:
+                bucket_side.add(price, 0, quantity)
+            side.buckets.append(bucket_side)
+
+        return buckets
+
+    def remove_buckets(self, buckets):
+        self.bids.buckets.remove(buckets.bids)
+        self.asks.buckets.remove(buckets.asks)
+
+    def _get_taker_side(self, side):
+        """ Return the side of the book an order of `side` trades against.
+        """
+
+        if side == OrderSides.BUY:
+            return self.asks
+        if side == OrderSides.SELL:
+            return self.bids
+        raise ValueError(f'invalid order side: {side}')
+
+    def spread(self):
+        if not (self.bids.prices and self.asks.prices):
+            return None
+        return self.asks.prices[0] - self.bids.prices[-1]
+
+    def mid(self):
+        if not (self.bids.prices and self.asks.prices):
+            return None
+        return (self.asks.prices[0] + self.bids.prices[-1]) / 2
+
+    def imbalance(self, levels=None):
+        """ Return (bid quantity - ask quantity) / (bid quantity + ask
+        quantity) over the best `levels` levels of each side (the whole
+        book if `levels` is None), from -1 (all asks) to 1 (all bids).
+        """
+
+        bids = self.bids.depth(levels)
+        asks = self.asks.depth(levels)
+        if not bids + asks:
+            return None
+        return (bids - asks) / (bids + asks)
+
+    def vwap_for_quantity(self, side, quantity):
+        """ Return the average price of a market order of `side`
+        (`binance.enums.OrderSides`) for `quantity`, or None if the book
+        is too thin to fill it.
+        """
+
+        if quantity <= 0:
+            raise ValueError(f'invalid quantity: {quantity}')
+
+        notional = self._get_taker_side(side).fill_quantity(quantity)
+        if notional is None:
+            return None
+        return notional / quantity
+
+    def impact(self, side, notional):
+        """ Return how far the average price of a market order of `side`
+        spending `notional` is from the mid price, as a fraction of the
+        mid price (0.001 is 10 basis points worse than mid), or None if
+        the book is too thin to fill it.
+        """
+
+        if notional <= 0:
+            raise ValueError(f'invalid notional: {notional}')
+
+        mid = self.mid()
+        if mid is None:
+            return None
+
+        quantity = self._get_taker_side(side).fill_notional(notional)
+        if quantity is None:
+            return None
+
+        vwap = notional / quantity
+        if side == OrderSides.BUY:
+            return (vwap - mid) / mid
+        return (mid - vwap) / mid
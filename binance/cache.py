@@ -1,58 +1,277 @@
-""" DepthCache helper class for the Binance API Client.
+""" Cache helper classes for the Binance API Client.
 """
 
 
-from collections import deque
+import asyncio
+from collections import (
+    deque,
+    namedtuple,
+    OrderedDict,
+    )
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
+from .book import (
+    OrderBook,
+    PriceBuckets,
+    )
+from .candles import (
+    can_aggregate,
+    CandlestickBuffer,
+    DEFAULT_CANDLESTICK_CAPACITY,
+    get_candlestick_row,
+    get_interval_end,
+    get_interval_start,
+    get_kline_row,
+    merge_rows,
+    )
 from .storage import (
     Bid,
     Ask,
+    Candlestick,
     )
 from .utils import GetLoggerMixin
 
 
+# diff events buffered while the initial /depth snapshot is in flight
+MAX_QUEUED_EVENTS = 1000
+
+
+BookArrays = namedtuple('BookArrays', [
+    'bid_prices',
+    'bid_quantities',
+    'ask_prices',
+    'ask_quantities',
+    'bid_levels',
+    'ask_levels',
+    ])
+
+
+class DepthSyncError(Exception):
+    """ A diff event doesn't follow on from the book it is applied to,
+    so the book has to be reloaded from a new snapshot.
+    """
+
+
 class DepthCache(GetLoggerMixin):
+    """ Local order book, kept up to date from @depth diff events.
+
+    Events received before the snapshot is loaded are buffered.
+    Once it is loaded, buffered events that are already part of the
+    snapshot (`u` <= `lastUpdateId`) are dropped, the first remaining
+    event must straddle the snapshot (`U` <= `lastUpdateId` + 1 <= `u`),
+    and every event after that must start right after the previous one.
+    `DepthSyncError` is raised otherwise.
+    """
+
     __loggername__ = 'DepthCache'
 
-    def __init__(self):
-        self.bids = []
-        self.asks = []
+    def __init__(self, max_queued_events=MAX_QUEUED_EVENTS, **kwargs):
+        self.book = OrderBook()
+
+        # with `binance.ticks.TickScale`s, the book is keyed by integer
+        # ticks instead of floats
+        self.price_scale = kwargs.get('price_scale')
+        self.quantity_scale = kwargs.get('quantity_scale')
+        self.fixed_point = bool(self.price_scale and self.quantity_scale)
+        if self.fixed_point:
+            self._parse_price = self.price_scale.to_ticks
+            self._parse_quantity = self.quantity_scale.to_ticks
+            self._format_price = self.price_scale.to_float
+            self._format_quantity = self.quantity_scale.to_float
+        else:
+            self._parse_price = self._parse_quantity = float
+            self._format_price = self._format_quantity = float
+
+        # bumped on every change, so array views are only refilled
+        # when the book has changed
+        self.version = 0
+        self._arrays = {}
 
         self.received_api_response = False
-        self.event_queue = deque()
+        # if the buffer overflows, the oldest events are dropped and the
+        # snapshot won't line up, which is detected in set_initial_data
+        self.event_queue = deque(maxlen=max_queued_events)
         self.last_update_id = -1
 
+    def _format_level(self, level):
+        price, quantity = level
+        return self._format_price(price), self._format_quantity(quantity)
+
+    @property
+    def bids(self):
+        return [Bid(self._format_level(level)) for level in self.book.bids]
+
+    @property
+    def asks(self):
+        return [Ask(self._format_level(level)) for level in self.book.asks]
+
+    def best_bid(self):
+        level = self.book.best_bid()
+        return Bid(self._format_level(level)) if level else None
+
+    def best_ask(self):
+        level = self.book.best_ask()
+        return Ask(self._format_level(level)) if level else None
+
+    def top(self, k=None):
+        """ Return the best `k` bids and asks as lists of `Bid` and `Ask`.
+        """
+
+        bids, asks = self.book.top(k)
+        return [Bid(self._format_level(b)) for b in bids], \
+                [Ask(self._format_level(a)) for a in asks]
+
+    def as_arrays(self, levels=20, out=None):
+        """ Return the best `levels` levels of each side as numpy arrays.
+
+        The arrays are views into one preallocated `(4, levels)` buffer
+        per `levels` value, refilled in place only when the book has
+        changed, so repeated calls don't allocate. Pass a `(4, levels)`
+        array (e.g. one row of a `(books, 4, levels)` array) as `out` to
+        fill that instead. Rows are bid prices, bid quantities, ask
+        prices and ask quantities, best first; unused slots are 0. Prices
+        and quantities are in book units (integer ticks in fixed-point
+        mode).
+        """
+
+        if np is None:
+            raise ImportError('numpy is required for DepthCache.as_arrays()')
+
+        if out is None:
+            buffer, version, counts = self._arrays.get(levels, (None, -1, None))
+            if buffer is None:
+                dtype = np.int64 if self.fixed_point else np.float64
+                buffer = np.zeros((4, levels), dtype=dtype)
+            if version != self.version:
+                counts = self._fill_arrays(buffer, levels)
+                self._arrays[levels] = (buffer, self.version, counts)
+        else:
+            buffer = out
+            counts = self._fill_arrays(buffer, levels)
+
+        return BookArrays(buffer[0], buffer[1], buffer[2], buffer[3], *counts)
+
+    def _fill_arrays(self, buffer, levels):
+        counts = []
+        for row, side in ((0, self.book.bids), (2, self.book.asks)):
+            top = side.top(levels)
+            count = len(top)
+            if count:
+                buffer[row:row + 2, :count] = np.array(top).T
+            buffer[row:row + 2, count:] = 0
+            counts.append(count)
+
+        return counts
+
+    def add_buckets(self, width=None, percent=None):
+        """ Aggregate the book into price buckets of a fixed `width` (in
+        the quote asset) or `percent` of their price, kept up to date
+        with every change. Return the `binance.book.PriceBuckets`, to
+        read with `top_buckets()`.
+        """
+
+        if width is not None:
+            width = self._parse_price(width)
+        return self.book.add_buckets(PriceBuckets(width=width, percent=percent))
+
+    def remove_buckets(self, buckets):
+        self.book.remove_buckets(buckets)
+
+    def top_buckets(self, buckets, k=None):
+        """ Return the best `k` bid and ask buckets as lists of `Bid` and
+        `Ask`, priced at the lowest price of each bucket.
+        """
+
+        bids, asks = buckets.top(k)
+        return [Bid(self._format_level(b)) for b in bids], \
+                [Ask(self._format_level(a)) for a in asks]
+
+    def spread(self):
+        spread = self.book.spread()
+        return None if spread is None else self._format_price(spread)
+
+    def mid(self):
+        mid = self.book.mid()
+        return None if mid is None else self._format_price(mid)
+
+    def imbalance(self, levels=None):
+        return self.book.imbalance(levels)
+
+    def vwap_for_quantity(self, side, quantity):
+        """ Return the average price of a market order of `side` for
+        `quantity`, or None if the book is too thin to fill it.
+        """
+
+        vwap = self.book.vwap_for_quantity(side,
+                self._parse_quantity(quantity))
+        return None if vwap is None else self._format_price(vwap)
+
+    def impact(self, side, notional):
+        """ Return the distance of the average price of a market order of
+        `side` spending `notional` (in the quote asset) from the mid
+        price, as a fraction of the mid price.
+        """
+
+        if self.fixed_point:
+            # notionals in the book are in price ticks * quantity ticks
+            notional = float(notional) / float(
+                    self.price_scale.tick_size * self.quantity_scale.tick_size)
+        return self.book.impact(side, notional)
+
+    def changes_within(self, changes, k=None):
+        """ Return whether `changes` touched any of the best `k` levels.
+        """
+
+        return self.book.changes_within(changes, k)
+
+    def update(self, event):
+        """ Apply a diff event and return its `binance.book.BookChanges`,
+        or None if the event was buffered or already in the book.
+        """
+
+        if self.received_api_response:
+            return self._update(event)
+        else:
+            self.event_queue.append(event)
+
     def _update(self, event):
         logger = self._logger('_update')
 
-        if event['u'] < self.last_update_id: return
+        if event['u'] <= self.last_update_id: return None
+        if event['U'] > self.last_update_id + 1:
+            raise DepthSyncError(f'expected update {self.last_update_id + 1}, '
+                    f'got {event["U"]} - {event["u"]}')
         logger.debug(event['u'])
 
         self.last_update_id = event['u']
-        event_bids = {b[0]: Bid(b) for b in event['bids']}
-        event_asks = {a[0]: Ask(a) for a in event['asks']}
-
-        updated_bids = []
-        for bid in self.bids:
-            event_bid = event_bids.get(bid.price)
-            if not event_bid:
-                updated_asks.append(ask)
-            elif not event_bid.quantity:
-                continue
-            else:
-                updates_bids.append(event_bid)
-        self.bids = updated_bids
-
-        updated_asks = []
-        for ask in self.asks:
-            event_ask = event_asks.get(ask.price)
-            if not event_ask:
-                updated_asks.append(ask)
-            elif not event_ask.quantity:
-                continue
-            else:
-                updated_asks.append(ask)
-        self.asks = updated_asks
+        return self._apply_levels(event)
+
+    def _parse_levels(self, raw_levels):
+        parse_price = self._parse_price
+        parse_quantity = self._parse_quantity
+        return [(parse_price(price), parse_quantity(quantity))
+                for price, quantity in raw_levels]
+
+    def _apply_levels(self, event):
+        self.version += 1
+        return self.book.apply(self._parse_levels(event['b']),
+                self._parse_levels(event['a']))
+
+    def reset(self):
+        """ Forget the book, e.g. before loading a fresh snapshot.
+        """
+
+        self.book.clear()
+        self.version += 1
+        self.received_api_response = False
+        self.event_queue.clear()
+        self.last_update_id = -1
 
     def set_initial_data(self, depth):
         logger = self._logger('set_initial_data')
@@ -60,8 +279,10 @@ class DepthCache(GetLoggerMixin):
         self.last_update_id = depth.update_id
         logger.debug(f'set_initial_data: {self.last_update_id}')
 
-        self.bids = depth.bids
-        self.asks = depth.asks
+        self.version += 1
+        self.book.load(
+                self._parse_levels((b.price, b.quantity) for b in depth.bids),
+                self._parse_levels((a.price, a.quantity) for a in depth.asks))
         while self.event_queue:
             event = self.event_queue.popleft()
             self._update(event)
@@ -69,12 +290,7 @@ class DepthCache(GetLoggerMixin):
         self.received_api_response = True
 
     def pretty_print(self, depth=40):
-        if depth:
-            bids = self.bids[:depth]
-            asks = self.asks[:depth]
-        else:
-            bids = self.bids
-            asks = self.asks
+        bids, asks = self.top(depth or None)
 
         print('Bids')
         for bid in bids:
@@ -87,55 +303,391 @@ class DepthCache(GetLoggerMixin):
 
 
 class CandlestickCache(GetLoggerMixin):
+    """ The latest `capacity` candlesticks of one symbol and interval,
+    kept up to date from @kline events.
+
+    Candlesticks are stored column by column in a
+    `binance.candles.CandlestickBuffer`; use `columns()` to read them
+    as arrays, or `candlesticks` to get `Candlestick` objects.
+
+    Events received before the initial candlesticks are loaded are
+    buffered. If a candlestick opens more than one interval after the
+    previous one, the `(start_time, end_time)` range of open times to
+    refetch is added to `missing`; fetch it and pass the candlesticks
+    to `insert()`.
+
+    With a `store` (`binance.klinestore.KlineSeries`), every
+    candlestick is stored once its final event (`x`) is received, and
+    the initial candlesticks are extended back to `capacity` from the
+    store.
+    """
+
     __loggername__ = 'CandlestickCache'
 
-    def __init__(self):
-        self.candlesticks = []
+    def __init__(self, symbol=None, interval=None,
+            capacity=DEFAULT_CANDLESTICK_CAPACITY,
+            max_queued_events=MAX_QUEUED_EVENTS, store=None):
+        self.symbol = symbol
+        self.interval = interval
+        self.store = store
+        self.buffer = CandlestickBuffer(capacity)
+        self.aggregators = []
+        self.indicators = []
+        self.missing = []
+        self.received_api_response = False
+        self.event_queue = deque(maxlen=max_queued_events)
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def clear(self):
+        self.buffer.clear()
+        for indicator in self.indicators:
+            indicator.reset()
+        self.missing.clear()
         self.received_api_response = False
-        self.depth = 0
+        self.event_queue.clear()
+
+    @property
+    def candlesticks(self):
+        return self.buffer.to_candlesticks(self.symbol)
+
+    def latest(self):
+        """ Return the latest (usually still open) `Candlestick`.
+        """
+
+        if not len(self.buffer):
+            return None
+        return Candlestick(self.symbol, list(self.buffer.row(-1)))
+
+    def columns(self, n=None):
+        """ Return zero-copy `binance.candles.CandlestickColumns` of the
+        latest `n` candlesticks.
+        """
+
+        return self.buffer.latest(n)
 
     def update(self, event):
         if self.received_api_response:
             self._update(event)
+        else:
+            self.event_queue.append(event)
 
     def _update(self, event):
-        logger = self._logger('_update')
+        kline = event['k']
+        row = get_kline_row(kline)
+        self._apply(row)
+
+        # only final events are stored: a candlestick that closed while
+        # the stream was down would be stored with stale values
+        if self.store is not None and kline.get('x'):
+            self.store.write([row], row[0], row[6] + 1)
 
-        event_candlestick = Candlestick.from_websocket_event(event)
-        latest_candlestick = self.candlesticks[-1]
+    def _apply(self, row, check_gaps=True):
+        logger = self._logger('_apply')
+        buffer = self.buffer
 
         # if the event candlestick has the same time window
         # as the latest candlestick, update the latest candlestick
-        # 
+        #
         # if the event candlestick is of a newer time window
-        # than the latest candlestick, add it to the list
-        # keep candlestick list a certain length
-        if event_candlestick.open_time == latest_candlestick.open_time:
-            self.candlesticks[-1] = event_candlestick
-        elif event_candlestick.open_time > latest_candlestick.open_time:
-            self.candlesticks.append(event_candlestick)
-            if len(self.candlesticks) > self.depth:
-                self.candlesticks.pop(0)
+        # than the latest candlestick, add it to the buffer,
+        # dropping the oldest candlestick once it is full
+        latest_open_time = buffer.get(-1) if len(buffer) else -1
+        if row[0] == latest_open_time:
+            buffer.update_last(row)
+        elif row[0] > latest_open_time:
+            logger.debug(f'{self.symbol} {self.interval} new candlestick: {row[0]}')
+            if check_gaps and self.interval and latest_open_time >= 0 and \
+                    row[0] > get_interval_end(self.interval, latest_open_time) + 1:
+                # the latest candlestick missed its last updates as well
+                logger.warning(f'{self.symbol} {self.interval} missed '
+                        f'candlesticks {latest_open_time} - {row[0]}')
+                self.missing.append((latest_open_time, row[0]))
+            buffer.append(row)
+        else:
+            return
+
+        for aggregator in self.aggregators:
+            aggregator.update(row)
+        for indicator in self.indicators:
+            indicator.update(row)
+
+    def _load(self, rows):
+        self.buffer.clear()
+        for row in rows[-self.buffer.capacity:]:
+            self.buffer.append(row)
+        for aggregator in self.aggregators:
+            aggregator.load(self.buffer.rows())
+        for indicator in self.indicators:
+            indicator.load(self.buffer.rows())
 
     def set_initial_data(self, candlesticks):
         self._logger().info('set_initial_data')
 
-        self.candlesticks = candlesticks
-        self.depth = len(self.candlesticks)
+        rows = [get_candlestick_row(c) for c in candlesticks]
+        if self.store is not None and len(rows) < self.buffer.capacity:
+            rows = self.store.tail(self.buffer.capacity - len(rows),
+                    end_time=rows[0][0] if rows else None) + rows
+
+        self._load(rows)
+        while self.event_queue:
+            self._update(self.event_queue.popleft())
+
         self.received_api_response = True
 
-    def pretty_print(self, depth=40):
-        if depth:
-            candlesticks = self.candlesticks[-depth:]
-        else:
-            candlesticks = self.candlesticks
+    def take_missing(self):
+        """ Return the missing ranges and forget them.
+        """
+
+        missing, self.missing = self.missing, []
+        return missing
+
+    def insert(self, candlesticks):
+        """ Merge closed candlesticks, e.g. refetched after a gap, into
+        the cache. They replace buffered candlesticks with the same open
+        time, except the latest one, which the stream keeps updating.
+
+        The buffer is rebuilt and aggregators and indicators reloaded,
+        which is O(capacity).
+        """
+
+        self._logger('insert').info(f'{self.symbol} {self.interval} '
+                f'{len(candlesticks)} candlesticks')
 
-        for candlestick in candlesticks:
+        rows = {row[0] : row for row in self.buffer.rows()}
+        latest_open_time = self.buffer.get(-1) if len(self.buffer) else None
+        inserted = [get_candlestick_row(c) for c in candlesticks]
+        inserted = [row for row in inserted
+                if latest_open_time is None or row[0] < latest_open_time]
+        for row in inserted:
+            rows[row[0]] = row
+
+        if self.store is not None and inserted:
+            self.store.write(inserted, inserted[0][0], inserted[-1][6] + 1)
+
+        self._load([rows[open_time] for open_time in sorted(rows)])
+
+    def add_indicator(self, indicator):
+        """ Keep a `binance.indicators.Indicator` up to date with this
+        cache, starting from the candlesticks already in it.
+        """
+
+        indicator.load(self.buffer.rows())
+        self.indicators.append(indicator)
+
+        return indicator
+
+    def remove_indicator(self, indicator):
+        self.indicators.remove(indicator)
+
+    def aggregate(self, interval, capacity=None):
+        """ Return a `CandlestickCache` of `interval` candlesticks built
+        from the candlesticks of this cache, and kept up to date with it.
+        """
+
+        aggregator = CandlestickAggregator(self.interval, CandlestickCache(
+                self.symbol, interval, capacity or self.buffer.capacity))
+        if self.received_api_response:
+            aggregator.load(self.buffer.rows())
+        self.aggregators.append(aggregator)
+
+        return aggregator.cache
+
+    def pretty_print(self, depth=40):
+        for candlestick in self.buffer.to_candlesticks(self.symbol, depth or None):
             date_string = candlestick.open_time.strftime('%Y-%m-%d %H:%M:%S')
             print(f'{candlestick.symbol} {date_string}')
             print(f'      open: {candlestick.price.open}')
             print(f'      high: {candlestick.price.high}')
             print(f'       low: {candlestick.price.low}')
-            print(f'     close: {candlestick.price.low}')
+            print(f'     close: {candlestick.price.close}')
             print(f'    volume: {candlestick.volume}')
             print()
+
+
+class CandlestickAggregator(GetLoggerMixin):
+    """ Build the candlesticks of `cache` from candlestick rows of a
+    shorter `base_interval` that evenly divides it.
+
+    The base candlesticks of the current window that have closed are
+    merged once, so every update of the open base candlestick is a
+    single merge. A window whose first base candlestick is missing (e.g.
+    at the start of the base history) is skipped, since its open price
+    is unknown.
+    """
+
+    __loggername__ = 'CandlestickAggregator'
+
+    def __init__(self, base_interval, cache):
+        if not can_aggregate(base_interval, cache.interval):
+            raise ValueError(f'can not build {cache.interval} candlesticks '
+                    f'from {base_interval} candlesticks')
+
+        self.base_interval = base_interval
+        self.cache = cache
+        self.interval = cache.interval
+        self.reset()
+
+    def reset(self):
+        self.cache.clear()
+        self._start = None
+        self._close_time = None
+        self._complete = False
+        # the merged closed base candlesticks of the window, and the
+        # latest (open) base candlestick
+        self._closed = None
+        self._live = None
+
+    def load(self, rows):
+        self.reset()
+        for row in rows:
+            self.update(row)
+        self.cache.received_api_response = True
+
+    def update(self, row):
+        """ Apply a new or updated base candlestick row.
+        """
+
+        open_time = row[0]
+        start = get_interval_start(self.interval, open_time)
+        if start != self._start:
+            if self._start is not None and start < self._start:
+                return
+            self._start = start
+            self._close_time = get_interval_end(self.interval, start)
+            self._complete = open_time == start
+            self._closed = None
+        elif open_time > self._live[0]:
+            # the previous base candlestick has closed
+            live = self._live
+            self._closed = live if self._closed is None else \
+                    merge_rows(self._closed, live)
+        elif open_time < self._live[0]:
+            return
+        self._live = row
+
+        if not self._complete:
+            return
+
+        merged = row if self._closed is None else merge_rows(self._closed, row)
+        # gaps in the base candlesticks are refetched there
+        self.cache._apply(
+                (start,) + merged[1:6] + (self._close_time,) + merged[7:],
+                check_gaps=False)
+
+
+class _Flight:
+    """ A sync request that other callers are waiting on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache(GetLoggerMixin):
+    """ LRU cache of API responses with a TTL per endpoint path.
+
+    Concurrent requests for the same key share one in-flight request.
+    A TTL of 0 only merges in-flight requests without storing the
+    response. Paths without a TTL are not cached at all.
+    """
+
+    __loggername__ = 'ResponseCache'
+
+    def __init__(self, ttls=None, max_size=1024):
+        self.ttls = dict(ttls or {})
+        self.max_size = max_size
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._async_flights = {}
+
+    def get_ttl(self, path):
+        return self.ttls.get(path)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def _set(self, key, value, ttl):
+        if not ttl:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def fetch(self, key, ttl, fetch):
+        """ Return the cached response for `key`, or call `fetch()`
+        once for every caller that asks for it at the same time.
+        """
+
+        with self._lock:
+            entry = self._get(key)
+            if entry is not None:
+                return entry[1]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fetch()
+            self._set(key, flight.value, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def fetch_async(self, key, ttl, fetch):
+        """ Coroutine version of `fetch()`. `fetch` is a coroutine function.
+        """
+
+        with self._lock:
+            entry = self._get(key)
+        if entry is not None:
+            return entry[1]
+
+        task = self._async_flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._async_flights[key] = task
+
+            def _land(task):
+                self._async_flights.pop(key, None)
+                if not task.cancelled() and task.exception() is None:
+                    self._set(key, task.result(), ttl)
+            task.add_done_callback(_land)
+
+        # one caller being cancelled must not cancel the others
+        return await asyncio.shield(task)
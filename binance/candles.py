@@ -0,0 +1,260 @@
+""" Columnar candlestick storage for the Binance API Client.
+"""
+
+
+from array import array
+from collections import namedtuple
+from datetime import (
+    datetime,
+    timezone,
+    )
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .enums import (
+    CandlestickIntervals,
+    INTERVAL_MILLISECONDS,
+    )
+from .storage import Candlestick
+
+
+# the columns of a candlestick row, in /klines order, and their
+# `array` type codes
+CANDLESTICK_COLUMNS = (
+    ('open_time', 'q'),
+    ('open', 'd'),
+    ('high', 'd'),
+    ('low', 'd'),
+    ('close', 'd'),
+    ('volume', 'd'),
+    ('close_time', 'q'),
+    ('quote_asset_volume', 'd'),
+    ('trades', 'q'),
+    ('taker_buy_base_asset_volume', 'd'),
+    ('taker_buy_quote_asset_volume', 'd'),
+)
+
+DEFAULT_CANDLESTICK_CAPACITY = 1000
+
+DAY_MILLISECONDS = INTERVAL_MILLISECONDS[CandlestickIntervals.ONE_DAY]
+# the epoch is a thursday, binance weeks start on monday
+WEEK_OFFSET = 4 * DAY_MILLISECONDS
+
+CandlestickColumns = namedtuple('CandlestickColumns',
+        [name for name, _ in CANDLESTICK_COLUMNS])
+
+
+def get_candlestick_row(candlestick):
+    """ Return a `binance.storage.Candlestick` as a row of column values.
+    """
+
+    return (
+        int(candlestick.open_time.timestamp() * 1000),
+        float(candlestick.price.open),
+        float(candlestick.price.high),
+        float(candlestick.price.low),
+        float(candlestick.price.close),
+        float(candlestick.volume),
+        int(candlestick.close_time.timestamp() * 1000),
+        float(candlestick.quote_asset_volume),
+        int(candlestick.trades),
+        float(candlestick.taker_buy_base_asset_volume),
+        float(candlestick.taker_buy_quote_asset_volume),
+    )
+
+
+def get_kline_row(kline):
+    """ Return the `k` object of a @kline event as a row of column values.
+    """
+
+    return (
+        kline['t'],
+        float(kline['o']),
+        float(kline['h']),
+        float(kline['l']),
+        float(kline['c']),
+        float(kline['v']),
+        kline['T'],
+        float(kline['q']),
+        kline['n'],
+        float(kline['V']),
+        float(kline['Q']),
+    )
+
+
+def get_interval_start(interval, timestamp):
+    """ Return the open time of the `interval` candlestick containing
+    `timestamp` (milliseconds), aligned like the exchange's: weeks start
+    on monday and months on the 1st, in UTC.
+    """
+
+    if interval == CandlestickIntervals.ONE_MONTH:
+        date = datetime.fromtimestamp(timestamp // 1000, timezone.utc)
+        start = datetime(date.year, date.month, 1, tzinfo=timezone.utc)
+        return int(start.timestamp()) * 1000
+
+    length = INTERVAL_MILLISECONDS[interval]
+    offset = WEEK_OFFSET if interval == CandlestickIntervals.ONE_WEEK_ else 0
+    return (timestamp - offset) // length * length + offset
+
+
+def get_interval_end(interval, open_time):
+    """ Return the close time of the `interval` candlestick opened at
+    `open_time`, i.e. the millisecond before the next one opens.
+    """
+
+    if interval == CandlestickIntervals.ONE_MONTH:
+        date = datetime.fromtimestamp(open_time // 1000, timezone.utc)
+        year, month = divmod(date.year * 12 + date.month, 12)
+        end = datetime(year, month + 1, 1, tzinfo=timezone.utc)
+        return int(end.timestamp()) * 1000 - 1
+
+    return open_time + INTERVAL_MILLISECONDS[interval] - 1
+
+
+def add_intervals(interval, open_time, count):
+    """ Return the open time of the `interval` candlestick `count`
+    candlesticks after the one opened at `open_time` (before it if
+    `count` is negative). Months are calendar months.
+    """
+
+    if interval == CandlestickIntervals.ONE_MONTH:
+        date = datetime.fromtimestamp(open_time // 1000, timezone.utc)
+        year, month = divmod(date.year * 12 + date.month - 1 + count, 12)
+        start = datetime(year, month + 1, 1, tzinfo=timezone.utc)
+        return int(start.timestamp()) * 1000
+
+    return open_time + count * INTERVAL_MILLISECONDS[interval]
+
+
+def can_aggregate(base_interval, interval):
+    """ Return whether `interval` candlesticks can be built from whole
+    `base_interval` candlesticks.
+    """
+
+    base_length = INTERVAL_MILLISECONDS[base_interval]
+    if interval == CandlestickIntervals.ONE_MONTH:
+        return not DAY_MILLISECONDS % base_length
+
+    length = INTERVAL_MILLISECONDS[interval]
+    return length > base_length and not length % base_length
+
+
+def merge_rows(first, last):
+    """ Return the row of two consecutive candlestick rows merged into one.
+    """
+
+    return (
+        first[0],
+        first[1],
+        max(first[2], last[2]),
+        min(first[3], last[3]),
+        last[4],
+        first[5] + last[5],
+        last[6],
+        first[7] + last[7],
+        first[8] + last[8],
+        first[9] + last[9],
+        first[10] + last[10],
+    )
+
+
+class CandlestickBuffer:
+    """ The latest `capacity` candlesticks, stored column by column.
+
+    Every column is a preallocated `array` of twice the capacity, and
+    each row is written to both halves. The latest `n` rows are then
+    always one contiguous slice, so appending, updating the last row
+    and reading the latest rows are all O(1) and never copy. Slices
+    are numpy arrays if numpy is installed, and memoryviews otherwise.
+    """
+
+    def __init__(self, capacity=DEFAULT_CANDLESTICK_CAPACITY):
+        if capacity < 1:
+            raise ValueError(f'invalid capacity: {capacity}')
+
+        self.capacity = capacity
+        self.columns = [array(typecode, [0]) * (2 * capacity)
+                for _, typecode in CANDLESTICK_COLUMNS]
+        if np is not None:
+            self._views = [np.frombuffer(column, dtype=column.typecode)
+                    for column in self.columns]
+        else:
+            self._views = [memoryview(column) for column in self.columns]
+
+        # the next row is written at `_end` (and `_end + capacity`)
+        self._end = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        self._end = 0
+        self._size = 0
+
+    def _write(self, index, row):
+        mirror = index + self.capacity
+        for column, value in zip(self.columns, row):
+            column[index] = value
+            column[mirror] = value
+
+    def append(self, row):
+        """ Add a row, dropping the oldest one if the buffer is full.
+        """
+
+        self._write(self._end, row)
+        self._end = (self._end + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def update_last(self, row):
+        if not self._size:
+            raise IndexError('update_last() on an empty buffer')
+        self._write((self._end - 1) % self.capacity, row)
+
+    def _get_index(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('candlestick index out of range')
+
+        return self._end + self.capacity - self._size + index
+
+    def row(self, index):
+        """ Return row `index` (oldest first; negative from the latest)
+        as a tuple of column values.
+        """
+
+        index = self._get_index(index)
+        return tuple(column[index] for column in self.columns)
+
+    def get(self, index, column=0):
+        return self.columns[column][self._get_index(index)]
+
+    def rows(self):
+        """ Iterate over every row, oldest first.
+        """
+
+        for index in range(self._size):
+            yield self.row(index)
+
+    def latest(self, n=None):
+        """ Return `CandlestickColumns` of zero-copy views of the latest
+        `n` rows (all rows if `n` is None), oldest first.
+        """
+
+        n = self._size if n is None else max(0, min(n, self._size))
+        stop = self._end + self.capacity
+        return CandlestickColumns(*(view[stop - n:stop] for view in self._views))
+
+    def to_candlesticks(self, symbol, n=None):
+        """ Return the latest `n` rows as `binance.storage.Candlestick`s.
+        """
+
+        n = self._size if n is None else min(n, self._size)
+        return [Candlestick(symbol, list(self.row(i)))
+                for i in range(self._size - n, self._size)]
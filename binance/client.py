@@ -3,46 +3,84 @@
 
 
 import asyncio
+from collections import deque
+import functools
 import hashlib
 import hmac
-import json
 import time
 from urllib.parse import quote
 
 import aiohttp
 import requests
-import websockets as ws
+from requests.adapters import HTTPAdapter
 
 from .cache import (
     DepthCache,
+    DepthSyncError,
     CandlestickCache,
+    ResponseCache,
     )
+from .candles import (
+    DEFAULT_CANDLESTICK_CAPACITY,
+    add_intervals,
+    get_candlestick_row,
+    get_interval_start,
+    )
+from .clock import ServerClock
 from .enums import (
+    INTERVAL_MILLISECONDS,
     OrderSides,
     OrderTypes,
+    RequestPriorities,
     TimeInForce,
     )
+from .klinestore import KlineStore
+from .ratelimit import (
+    RateLimiter,
+    SnapshotScheduler,
+    )
 from .storage import (
     Account,
     Candlestick,
     Deposit,
     Depth,
     Order,
+    SymbolInfo,
     Ticker,
+    TickerTable,
     Trade,
     Withdraw,
     )
-from .utils import GetLoggerMixin
+from .streams import (
+    DEFAULT_MAX_BACKOFF,
+    DEFAULT_MAX_STREAMS_PER_CONNECTION,
+    DEFAULT_MIN_BACKOFF,
+    StreamHandle,
+    StreamManager,
+    get_depth_stream_name,
+    get_kline_stream_name,
+    )
+from .ticks import TickScale
+from .utils import (
+    GetLoggerMixin,
+    json_loads,
+    )
 
 
 API_BASE_URL = 'https://www.binance.com'
 
-WEBSOCKET_BASE_URL = 'wss://stream.binance.com:9443/ws/{symbol}'
-DEPTH_WEBSOCKET_URL = '{}@depth'.format(WEBSOCKET_BASE_URL)
-KLINE_WEBSOCKET_URL = '{}@kline'.format(WEBSOCKET_BASE_URL)
-
 CONTENT_TYPE = 'x-www-form-urlencoded'
 
+MAX_KLINES_LIMIT = 1000
+
+DEFAULT_RECV_WINDOW = 6000
+# orders are sent with the wider window until the clock has been synced
+UNSYNCED_ORDER_RECV_WINDOW = 60000
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+DEFAULT_DNS_CACHE_TTL = 300
+
 
 class Endpoints:
     PING = 'api/v1/ping'
@@ -53,138 +91,546 @@ class Endpoints:
     ALL_ORDERS = 'api/v3/allOrders'
     OPEN_ORDERS = 'api/v3/openOrders'
     TICKER_ALL = 'api/v1/ticker/allPrices'
+    TICKER_PRICE = 'api/v3/ticker/price'
     TICKER_BEST = '/api/v1/ticker/allBookTickers'
     TICKER_24HR = '/api/v1/ticker/ticker/24hr'
     DEPTH = 'api/v1/depth'
+    EXCHANGE_INFO = 'api/v1/exchangeInfo'
     KLINES = 'api/v1/klines'
     WITHDRAW = 'wapi/v1/withdraw.html'
     WITHDRAW_HISTORY = 'wapi/v1/getWithdrawHistory.html'
     DEPOSIT_HISTORY = 'wapi/v1/getDepositHistory.html'
 
 
+ENDPOINT_WEIGHTS = {
+    Endpoints.PING : 1,
+    Endpoints.SERVER_TIME : 1,
+    Endpoints.ACCOUNT_INFO : 5,
+    Endpoints.TRADE_INFO : 5,
+    Endpoints.ORDER : 1,
+    Endpoints.ALL_ORDERS : 5,
+    Endpoints.OPEN_ORDERS : 1,
+    Endpoints.TICKER_ALL : 1,
+    Endpoints.TICKER_PRICE : 1,
+    Endpoints.TICKER_BEST : 1,
+    Endpoints.TICKER_24HR : 1,
+    Endpoints.DEPTH : 1,
+    Endpoints.EXCHANGE_INFO : 1,
+    Endpoints.KLINES : 1,
+    Endpoints.WITHDRAW : 1,
+    Endpoints.WITHDRAW_HISTORY : 1,
+    Endpoints.DEPOSIT_HISTORY : 1,
+}
+
+# seconds a response is cached when `cache_responses` is enabled.
+# 0 only merges identical in-flight requests.
+DEFAULT_CACHE_TTLS = {
+    Endpoints.PING : 0,
+    Endpoints.SERVER_TIME : 0,
+    Endpoints.TICKER_ALL : 1,
+    Endpoints.TICKER_PRICE : 1,
+    Endpoints.TICKER_BEST : 1,
+    Endpoints.TICKER_24HR : 5,
+    Endpoints.DEPTH : 0,
+    Endpoints.EXCHANGE_INFO : 60,
+    Endpoints.KLINES : 1,
+}
+
+# (max limit, weight) pairs for the /depth endpoint
+DEPTH_LIMIT_WEIGHTS = (
+    (100, 1),
+    (500, 5),
+    (1000, 10),
+)
+MAX_DEPTH_WEIGHT = 50
+
+
 class BinanceClient(GetLoggerMixin):
     __loggername__ = 'BinanceClient'
 
-    def __init__(self, apikey, apisecret):
+    def __init__(self, apikey, apisecret, **kwargs):
         if not apikey or not apisecret:
             self._logger().error('invalid api key/secret')
             raise ValueError('invalid api key/secret')
 
         self.apikey = apikey
         self.apisecret = apisecret
+        self._hmac = hmac.new(apisecret.encode(), digestmod=hashlib.sha256)
+        self._urls = {}
         self.headers = {
             'X-MBX-APIKEY' : self.apikey,
             'content_type' : CONTENT_TYPE
         }
 
-        self._loop = asyncio.get_event_loop()
+        self.pool_size = kwargs.get('pool_size', DEFAULT_POOL_SIZE)
+        self.keepalive_timeout = kwargs.get('keepalive_timeout',
+                DEFAULT_KEEPALIVE_TIMEOUT)
+        self.dns_cache_ttl = kwargs.get('dns_cache_ttl', DEFAULT_DNS_CACHE_TTL)
+
+        try:
+            self._loop = asyncio.get_event_loop()
+        except RuntimeError:
+            # no current loop, e.g. after asyncio.run() in the main thread
+            self._loop = None
+        self._session = self._create_session()
+        # the aiohttp session and the semaphore are bound to the event
+        # loop they were created on, and recreated on any other loop
+        self._async_session = None
+        self._async_session_loop = None
+        self.max_concurrency = kwargs.get('max_concurrency', self.pool_size)
+        self._request_semaphore = None
+        self._request_semaphore_loop = None
+        self.rate_limiter = kwargs.get('rate_limiter', RateLimiter())
+        self.clock = kwargs.get('clock', ServerClock())
+        self.recv_window = kwargs.get('recv_window')
+        self.response_cache = kwargs.get('response_cache')
+        if self.response_cache is None and kwargs.get('cache_responses'):
+            self.response_cache = ResponseCache(DEFAULT_CACHE_TTLS)
+        self.kline_store = kwargs.get('kline_store')
+        if self.kline_store is None and kwargs.get('kline_store_path'):
+            self.kline_store = KlineStore(kwargs['kline_store_path'])
+        self.stream_manager = StreamManager(
+                max_streams_per_connection=kwargs.get(
+                    'max_streams_per_connection',
+                    DEFAULT_MAX_STREAMS_PER_CONNECTION),
+                min_backoff=kwargs.get('min_backoff', DEFAULT_MIN_BACKOFF),
+                max_backoff=kwargs.get('max_backoff', DEFAULT_MAX_BACKOFF))
+        self.snapshot_scheduler = kwargs.get('snapshot_scheduler',
+                SnapshotScheduler())
+        self.stream_handles = {}
+        # exchangeInfo for fixed point streams, fetched once per client
+        self._symbol_info = None
+        self._symbol_info_task = None
         self.depth_cache = {}
         self.candlestick_cache = {}
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close_async()
+
+    def _create_session(self):
+        session = requests.Session()
+        session.headers.update(self.headers)
+
+        adapter = HTTPAdapter(
+                pool_connections=self.pool_size,
+                pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+
+        return session
+
+    def _get_loop(self):
+        """ The event loop the sync wrappers run coroutines on.
+        """
+
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+
+        return self._loop
+
+    def _get_async_session(self):
+        """ The aiohttp session has to be created from inside a
+        running event loop, so it is created on first use, and again
+        when it is used from another loop (e.g. a second `asyncio.run()`).
+        """
+
+        loop = asyncio.get_running_loop()
+        if self._async_session is not None and self._async_session_loop is not loop:
+            self._discard_async_session()
+
+        if self._async_session is None or self._async_session.closed:
+            connector = aiohttp.TCPConnector(
+                    limit=self.pool_size,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=self.dns_cache_ttl)
+            self._async_session = aiohttp.ClientSession(
+                    connector=connector, headers=self.headers)
+            self._async_session_loop = loop
+
+        return self._async_session
+
+    def _discard_async_session(self):
+        """ Close the aiohttp session, as far as its event loop allows,
+        and forget it.
+        """
+
+        session, loop = self._async_session, self._async_session_loop
+        self._async_session = self._async_session_loop = None
+        if session is None or session.closed:
+            return
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if loop is running_loop:
+            loop.create_task(session.close())
+        elif loop.is_running():
+            # still running on another thread
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        elif not loop.is_closed() and running_loop is None:
+            loop.run_until_complete(session.close())
+        else:
+            # the close coroutine can't run on its loop anymore, so drop
+            # the pooled connections directly
+            connector = session.connector
+            session.detach()
+            try:
+                connector._close()
+            except RuntimeError:
+                pass
+
+    def _get_request_semaphore(self):
+        loop = asyncio.get_running_loop()
+        if self._request_semaphore is None or self._request_semaphore_loop is not loop:
+            self._request_semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._request_semaphore_loop = loop
+
+        return self._request_semaphore
+
+    def close(self):
+        """ Close the pooled HTTP sessions.
+
+        If the aiohttp session's event loop is running, the session is
+        closed in the background. Use `close_async()` to wait for it.
+        """
+
+        self._session.close()
+        self._discard_async_session()
+
+    async def close_async(self):
+        self._session.close()
+
+        if self._async_session is not None and \
+                self._async_session_loop is asyncio.get_running_loop():
+            session = self._async_session
+            self._async_session = self._async_session_loop = None
+            if not session.closed:
+                await session.close()
+        else:
+            self._discard_async_session()
+
+    def _get_url(self, path):
+        url = self._urls.get(path)
+        if url is None:
+            url = self._urls[path] = f'{API_BASE_URL}/{path}'
+
+        return url
+
     def _prepare_request(self, path, verb, params, signed):
         params = params or {}
 
         if signed:
             url = self._sign_request(path, params)
         elif params:
-            query_string = self._get_sorted_query_string(params)
-            url = '{}/{}?{}'.format(API_BASE_URL, path, query_string)
+            url = f'{self._get_url(path)}?{self._get_query_string(params)}'
         else:
-            url = '{}/{}'.format(API_BASE_URL, path)
+            url = self._get_url(path)
 
         return url
 
-    def _make_request(self, path, verb='get', params=None, signed=False):
-        logger = self._logger('_make_request')
+    def _get_request_weight(self, path, params):
+        if path != Endpoints.DEPTH:
+            return ENDPOINT_WEIGHTS.get(path, 1)
+
+        limit = (params or {}).get('limit', 100)
+        for max_limit, weight in DEPTH_LIMIT_WEIGHTS:
+            if limit <= max_limit:
+                return weight
+        return MAX_DEPTH_WEIGHT
+
+    def _get_rate_limit_args(self, path, verb, params, signed, priority):
+        weight = self._get_request_weight(path, params)
+        is_order = path == Endpoints.ORDER and verb in ('post', 'delete')
+        orders = 1 if is_order and verb == 'post' else 0
+
+        if priority is None:
+            if is_order:
+                priority = RequestPriorities.ORDER
+            elif signed:
+                priority = RequestPriorities.ACCOUNT
+            else:
+                priority = RequestPriorities.MARKET_DATA
+
+        return weight, orders, priority
+
+    def _update_rate_limiter(self, status, headers, sent):
+        if not self.rate_limiter:
+            return
+
+        self.rate_limiter.update(headers, sent)
+        if status in (418, 429):
+            self.rate_limiter.pause(int(headers.get('Retry-After', 60)))
+
+    def _get_cache_ttl(self, path, verb, signed):
+        if not self.response_cache or signed or verb.lower() != 'get':
+            return None
+        return self.response_cache.get_ttl(path)
+
+    def _make_request(self, path, verb='get', params=None, signed=False,
+            priority=None):
+        ttl = self._get_cache_ttl(path, verb, signed)
+        if ttl is None:
+            return self._send_request(path, verb, params, signed, priority)
+
+        key = self._prepare_request(path, verb, params, signed)
+        return self.response_cache.fetch(key, ttl, functools.partial(
+                self._send_request, path, verb, params, signed, priority))
+
+    def _send_request(self, path, verb='get', params=None, signed=False,
+            priority=None):
+        logger = self._logger('_send_request')
 
         verb = verb.lower()
+        if self.rate_limiter:
+            self.rate_limiter.acquire(*self._get_rate_limit_args(
+                    path, verb, params, signed, priority))
+
         url = self._prepare_request(path, verb, params, signed)
         logger.info(f'{verb.upper()} {url}')
 
-        http_function = getattr(requests, verb)
-        response = http_function(url, headers=self.headers)
-        response_json = response.json()
+        sent = time.time()
+        response = self._session.request(verb, url)
+        self._update_rate_limiter(response.status_code, response.headers, sent)
+        response_json = json_loads(response.content)
 
         # don't overwrite 'msg' in log record
         if 'msg' in response_json:
             response_json['message'] = response_json.pop('msg')
 
         if response.ok:
-            return response.json()
+            return response_json
 
         logger.error(f'error: {response.reason}', exc_info=True)
         logger.debug(response_json['message'], extra=response_json)
 
         raise response.raise_for_status()
 
-    async def _make_request_async(self, path, verb='get', params=None, signed=False):
-        logger = self._logger('_make_request_async')
+    async def _make_request_async(self, path, verb='get', params=None,
+            signed=False, priority=None):
+        ttl = self._get_cache_ttl(path, verb, signed)
+        if ttl is None:
+            return await self._send_request_async(path, verb, params,
+                    signed, priority)
 
-        verb = verb.lower()
-        url = self._prepare_request(path, verb, params, signed)
-        logger.info(f'{verb.upper()} {url}')
+        key = self._prepare_request(path, verb, params, signed)
+        return await self.response_cache.fetch_async(key, ttl, functools.partial(
+                self._send_request_async, path, verb, params, signed, priority))
 
-        async with aiohttp.ClientSession() as client:
-            http_function = getattr(client, verb)
-            response = await http_function(url, headers=self.headers)
-            response_json = await response.json(content_type=None)
+    async def _send_request_async(self, path, verb='get', params=None,
+            signed=False, priority=None):
+        logger = self._logger('_send_request_async')
 
-            # don't overwrite 'msg' in log record
-            if 'msg' in response_json:
-                response_json['message'] = response_json.pop('msg')
-
-            if response.reason == 'OK':
-                logger.debug('success', extra={'response' : response_json})
-                return response_json
-
-            logger.error(f'error: {response.reason}', exc_info=True)
-            logger.debug(response_json['message'], extra=response_json)
-
-            response.raise_for_status()
-
-    def _get_sorted_query_string(self, params):
-        sorted_parameters = []
-        for param in sorted(params.keys()):
-            url_encoded_value = quote(str(params[param]))
-            sorted_parameters.append('{}={}'.format(param, url_encoded_value))
+        verb = verb.lower()
+        if self.rate_limiter:
+            await self.rate_limiter.acquire_async(*self._get_rate_limit_args(
+                    path, verb, params, signed, priority))
+
+        session = self._get_async_session()
+        async with self._get_request_semaphore():
+            # sign once a slot is free so the timestamp isn't stale
+            url = self._prepare_request(path, verb, params, signed)
+            logger.info(f'{verb.upper()} {url}')
+
+            sent = time.time()
+            async with session.request(verb, url) as response:
+                self._update_rate_limiter(response.status, response.headers, sent)
+                response_json = json_loads(await response.read())
+
+                # don't overwrite 'msg' in log record
+                if 'msg' in response_json:
+                    response_json['message'] = response_json.pop('msg')
+
+                if response.reason == 'OK':
+                    logger.debug('success', extra={'response' : response_json})
+                    return response_json
+
+                logger.error(f'error: {response.reason}', exc_info=True)
+                logger.debug(response_json['message'], extra=response_json)
+
+                response.raise_for_status()
+
+    def _get_query_string(self, params):
+        """ The API doesn't require sorted parameters, so keep them in
+        insertion order. Every method builds its parameters in the same
+        order, so the query string for a given request is stable.
+        """
 
-        return '&'.join(sorted_parameters)
+        return '&'.join([f'{param}={quote(str(value))}'
+                for param, value in params.items()])
 
     def _sign_request(self, path, params):
-        url = '{}/{}'.format(API_BASE_URL, path)
-
-        params['timestamp'] = int(round(time.time() * 1000.0))
-        if 'recvWindow' not in params: params['recvWindow'] = 6000
-        query_string = self._get_sorted_query_string(params)
+        params['timestamp'] = self.clock.timestamp()
+        if 'recvWindow' not in params:
+            params['recvWindow'] = self.recv_window or DEFAULT_RECV_WINDOW
+        query_string = self._get_query_string(params)
 
-        signature = hmac.new(
-                self.apisecret.encode(),
-                digestmod=hashlib.sha256)
+        # copying the pre-keyed hmac skips hashing the key again
+        signature = self._hmac.copy()
         signature.update(query_string.encode())
 
-        return '{}?{}&signature={}'.format(
-                url, query_string, signature.hexdigest())
+        return f'{self._get_url(path)}?{query_string}&signature={signature.hexdigest()}'
 
     def ping(self):
         self._make_request(Endpoints.PING)
         return True
 
+    async def ping_async(self):
+        await self._make_request_async(Endpoints.PING)
+        return True
+
     def get_server_time(self):
         server_time = self._make_request(Endpoints.SERVER_TIME)
         return server_time['serverTime']
 
+    async def get_server_time_async(self):
+        server_time = await self._make_request_async(Endpoints.SERVER_TIME)
+        return server_time['serverTime']
+
+    def sync_clock(self):
+        """ Measure the server clock offset used to sign requests.
+        """
+
+        self.clock.sync(self)
+        return self.clock.offset
+
+    async def sync_clock_async(self):
+        await self.clock.sync_async(self)
+        return self.clock.offset
+
+    def start_clock_sync(self, interval=60):
+        """ Keep the server clock offset up to date in the background.
+
+        Return the `asyncio.Task`; cancel it to stop syncing.
+        """
+
+        return asyncio.ensure_future(self.clock.run(self, interval))
+
     def get_ticker(self, symbol=''):
         self._logger('get_ticker').info(symbol)
+
+        if symbol:
+            try:
+                raw_ticker = self._make_request(Endpoints.TICKER_PRICE,
+                        params={'symbol' : symbol})
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code == 400:
+                    raise ValueError(f'invalid symbol: {symbol}')
+                raise
+            return Ticker(raw_ticker)
+
         raw_tickers = self._make_request(Endpoints.TICKER_ALL)
+        return [Ticker(rt) for rt in raw_tickers]
+
+    async def get_ticker_async(self, symbol='', **kwargs):
+        self._logger('get_ticker_async').info(symbol)
 
         if symbol:
-            for raw_ticker in raw_tickers:
-                if raw_ticker['symbol'] == symbol:
-                    return Ticker(raw_ticker)
-            else:
-                raise ValueError(f'invalid symbol: {symbol}')
+            try:
+                raw_ticker = await self._make_request_async(
+                        Endpoints.TICKER_PRICE, params={'symbol' : symbol})
+            except aiohttp.ClientResponseError as e:
+                if e.status == 400:
+                    raise ValueError(f'invalid symbol: {symbol}')
+                raise
+            ticker = Ticker(raw_ticker)
+        else:
+            raw_tickers = await self._make_request_async(Endpoints.TICKER_ALL)
+            ticker = [Ticker(rt) for rt in raw_tickers]
+
+        await self._handle_callback(kwargs.get('callback'), ticker)
+
+        return ticker
+
+    def get_ticker_table(self, table=None):
+        """ Return a `TickerTable` of every symbol's price.
+
+        If `table` is given, it is refreshed in place and returned.
+        """
+
+        self._logger('get_ticker_table').info('')
+        raw_tickers = self._make_request(Endpoints.TICKER_ALL)
+
+        if table is None:
+            return TickerTable(raw_tickers)
+        table.update(raw_tickers)
+        return table
+
+    async def get_ticker_table_async(self, table=None, **kwargs):
+        self._logger('get_ticker_table_async').info('')
+        raw_tickers = await self._make_request_async(Endpoints.TICKER_ALL)
+
+        if table is None:
+            table = TickerTable(raw_tickers)
         else:
-            return [Ticker(rt) for rt in raw_tickers]
+            table.update(raw_tickers)
+        await self._handle_callback(kwargs.get('callback'), table)
+
+        return table
+
+    def get_exchange_info(self):
+        self._logger('get_exchange_info').info('')
+        raw_info = self._make_request(Endpoints.EXCHANGE_INFO)
+
+        return {s['symbol']: SymbolInfo(s) for s in raw_info['symbols']}
+
+    async def get_exchange_info_async(self, **kwargs):
+        self._logger('get_exchange_info_async').info('')
+        raw_info = await self._make_request_async(Endpoints.EXCHANGE_INFO)
+
+        symbols = {s['symbol']: SymbolInfo(s) for s in raw_info['symbols']}
+        await self._handle_callback(kwargs.get('callback'), symbols)
+
+        return symbols
+
+    def get_symbol_info(self, symbol):
+        self._logger('get_symbol_info').info(symbol)
+
+        symbols = self.get_exchange_info()
+        if symbol not in symbols:
+            raise ValueError(f'invalid symbol: {symbol}')
+        return symbols[symbol]
+
+    async def get_symbol_info_async(self, symbol, **kwargs):
+        self._logger('get_symbol_info_async').info(symbol)
+
+        symbols = await self.get_exchange_info_async()
+        if symbol not in symbols:
+            raise ValueError(f'invalid symbol: {symbol}')
+        await self._handle_callback(kwargs.get('callback'), symbols[symbol])
+
+        return symbols[symbol]
+
+    async def _get_cached_symbol_info_async(self, symbol):
+        """ Look `symbol` up in exchangeInfo, which is only downloaded
+        by the first call. Concurrent calls share that download.
+        """
+
+        if self._symbol_info is None:
+            task = self._symbol_info_task
+            if task is None or task.get_loop() is not asyncio.get_running_loop():
+                task = asyncio.ensure_future(self.get_exchange_info_async())
+                self._symbol_info_task = task
+            try:
+                # a cancelled caller doesn't cancel the shared download
+                self._symbol_info = await asyncio.shield(task)
+            except Exception:
+                if task.done():
+                    self._symbol_info_task = None
+                raise
+
+        if symbol not in self._symbol_info:
+            raise ValueError(f'invalid symbol: {symbol}')
+        return self._symbol_info[symbol]
 
     def get_depth(self, symbol):
         self._logger('get_depth').info(symbol)
@@ -202,52 +648,172 @@ class BinanceClient(GetLoggerMixin):
 
         return depth
 
-    def watch_depth(self, symbol):
-        self._logger('watch_depth').info(symbol)
-
+    def _get_depth_cache(self, symbol, **kwargs):
         cache = self.depth_cache.get(symbol)
         if not cache:
-            cache = DepthCache()
+            cache = DepthCache(**kwargs)
             self.depth_cache[symbol] = cache
 
-        async def _watch_for_depth_events():
-            logger = self._logger('_watch_for_depth_events')
-
-            url = DEPTH_WEBSOCKET_URL.format(symbol=symbol.lower())
-            logger.debug(f'opening websocket connection: {url}')
-            async with ws.connect(url) as socket:
-                while True:
-                    event = await socket.recv()
-                    try:
-                        event_dict = json.loads(event)
-                        logger.debug(f'event: {event_dict["u"]}')
-                        cache.update(event_dict)
-                    except:
-                        pass
-
-                    if hasattr(self, 'on_depth_event'):
-                        logger.debug('on_depth_event')
-                        await self.on_depth_event(event_dict)
-
-        async def _get_initial_depth_info():
-            logger = self._logger('_get_initial_depth_info')
-
-            depth = await self.get_depth_async(symbol)
-            cache.set_initial_data(depth)
-            logger.debug('depth ready')
-
-            if hasattr(self, 'on_depth_ready'):
-                logger.debug('on_depth_ready')
-                await self.on_depth_ready(depth)
-
-        self._loop.run_until_complete(asyncio.gather(
-            _watch_for_depth_events(),
-            _get_initial_depth_info()
-        ))
+        return cache
+
+    def _get_depth_event_handler(self, symbol, handle):
+        logger = self._logger('_on_depth_event')
+        cache = handle.cache
+
+        async def _on_depth_event(event_dict):
+            logger.debug(f'{symbol} event: {event_dict["u"]}')
+
+            # every event should start right after the previous one
+            last_event_id = handle.last_event_id
+            handle.last_event_id = event_dict['u']
+            if last_event_id is not None and event_dict['U'] != last_event_id + 1:
+                logger.warning(f'{symbol} missed events '
+                        f'{last_event_id + 1} - {event_dict["U"] - 1}')
+                self._resync_depth(symbol, handle)
+
+            changes = None
+            try:
+                changes = cache.update(event_dict)
+            except DepthSyncError as e:
+                logger.warning(f'{symbol} out of sync: {e}')
+                self._resync_depth(symbol, handle)
+            except Exception:
+                logger.exception(f'{symbol} failed to apply event')
+
+            handle.publish(cache)
+            if changes:
+                if hasattr(self, 'on_depth_changes'):
+                    logger.debug('on_depth_changes')
+                    await self.on_depth_changes(symbol, changes)
+                if changes.top_changed and hasattr(self, 'on_top_of_book'):
+                    logger.debug('on_top_of_book')
+                    await self.on_top_of_book(symbol, cache)
+            if hasattr(self, 'on_depth_event'):
+                logger.debug('on_depth_event')
+                await self.on_depth_event(event_dict)
+
+        return _on_depth_event
+
+    async def _get_initial_depth_info(self, symbol, handle):
+        logger = self._logger('_get_initial_depth_info')
+
+        # a snapshot taken before the stream is subscribed could be
+        # older than its first buffered event
+        await handle.subscribed.wait()
+        while True:
+            async with self.snapshot_scheduler:
+                depth = await self.get_depth_async(symbol)
+            try:
+                handle.cache.set_initial_data(depth)
+                break
+            except DepthSyncError as e:
+                # the snapshot is older than the buffered events
+                logger.warning(f'{symbol} snapshot out of sync: {e}')
+        handle.ready.set()
+        logger.debug(f'{symbol} depth ready')
+
+        if hasattr(self, 'on_depth_ready'):
+            logger.debug('on_depth_ready')
+            await self.on_depth_ready(depth)
+
+    def _resync_depth(self, symbol, handle):
+        """ Reload the depth of `symbol` from a fresh snapshot in the
+        background. Snapshots are staggered by `self.snapshot_scheduler`.
+        """
+
+        if handle.resyncing or handle.cancelled:
+            return
+
+        async def _resync():
+            self._logger('_resync_depth').info(symbol)
+
+            handle.ready.clear()
+            handle.cache.reset()
+            try:
+                await self._get_initial_depth_info(symbol, handle)
+            finally:
+                handle.resyncing = False
+
+        handle.resyncing = True
+        handle.add_task(_resync())
+
+    async def start_depth_stream(self, symbol, **kwargs):
+        """ Start watching the depth of `symbol` in the background.
+
+        Return a `binance.streams.StreamHandle`; its `cache` is the
+        `DepthCache` for `symbol`. Starting a stream that is already
+        running returns the running stream's handle.
+
+        With `fixed_point=True`, the book stores prices and quantities
+        as integer ticks of the symbol's tick size and step size.
+        """
+
+        name = get_depth_stream_name(symbol)
+        handle = self.stream_handles.get(name)
+        if handle is not None and not handle.cancelled:
+            return handle
+
+        self._logger('start_depth_stream').info(symbol)
+        cache_kwargs = {}
+        if kwargs.get('fixed_point') and symbol not in self.depth_cache:
+            symbol_info = await self._get_cached_symbol_info_async(symbol)
+            if symbol_info.tick_size is None or symbol_info.step_size is None:
+                raise ValueError(f'{symbol} has no tick size or step size')
+            cache_kwargs['price_scale'] = TickScale(symbol_info.tick_size)
+            cache_kwargs['quantity_scale'] = TickScale(symbol_info.step_size)
+
+        handle = StreamHandle(self.stream_manager, name,
+                self._get_depth_cache(symbol, **cache_kwargs))
+        self.stream_handles[name] = handle
+
+        async def _on_reconnect():
+            handle.last_event_id = None
+            self._resync_depth(symbol, handle)
+
+        await self.stream_manager.subscribe(name,
+                self._get_depth_event_handler(symbol, handle), _on_reconnect,
+                handle.subscribed)
+        handle.add_task(self._get_initial_depth_info(symbol, handle))
+        self.stream_manager.start()
+
+        return handle
+
+    async def stream_depth(self, symbol, **kwargs):
+        """ Asynchronous iterator over the `DepthCache` of `symbol`,
+        yielded after every update once the initial depth is loaded.
+        """
+
+        handle = await self.start_depth_stream(symbol, **kwargs)
+        await handle.wait_ready()
+        async for cache in handle.events(kwargs.get('maxsize', 1)):
+            yield cache
+
+    def watch_depth(self, symbol, **kwargs):
+        self._logger('watch_depth').info(symbol)
+        self.watch_many(depth_symbols=[symbol], **kwargs)
 
     def get_candlesticks(self, symbol, interval, **kwargs):
+        """ Return the candlesticks from `start_time` or up to `end_time`
+        (milliseconds), at most `limit` of them.
+
+        With a `kline_store`, stored candlesticks are read from disk and
+        only the missing ranges are fetched (and stored).
+        """
+
         self._logger('get_candlesticks').info(f'{symbol} {interval}')
 
+        if self.kline_store is None:
+            return self._fetch_candlesticks(symbol, interval, **kwargs)
+
+        start_time, stop_time, limit = self._get_candlesticks_range(
+                interval, **kwargs)
+        open_candlesticks = self._fill_kline_store(symbol, interval,
+                start_time, stop_time)
+        return self._get_stored_candlesticks(symbol, interval, start_time,
+                stop_time, limit, open_candlesticks,
+                kwargs.get('start_time') is not None)
+
+    def _fetch_candlesticks(self, symbol, interval, **kwargs):
         params = {
             'symbol' : symbol,
             'interval' : interval,
@@ -266,6 +832,22 @@ class BinanceClient(GetLoggerMixin):
         logger = self._logger('get_candlesticks_async')
         logger.info(f'{symbol} {interval}')
 
+        if self.kline_store is None:
+            candlesticks = await self._fetch_candlesticks_async(
+                    symbol, interval, **kwargs)
+        else:
+            start_time, stop_time, limit = self._get_candlesticks_range(
+                    interval, **kwargs)
+            open_candlesticks = await self._fill_kline_store_async(
+                    symbol, interval, start_time, stop_time)
+            candlesticks = self._get_stored_candlesticks(symbol, interval,
+                    start_time, stop_time, limit, open_candlesticks,
+                    kwargs.get('start_time') is not None)
+        await self._handle_callback(kwargs.get('callback'), candlesticks)
+
+        return candlesticks
+
+    async def _fetch_candlesticks_async(self, symbol, interval, **kwargs):
         params = {
             'symbol' : symbol,
             'interval' : interval,
@@ -278,11 +860,281 @@ class BinanceClient(GetLoggerMixin):
 
         raw_candlesticks = await self._make_request_async(Endpoints.KLINES,
                 verb='get', params=params)
-        candlesticks = [Candlestick(symbol, cs) for cs in raw_candlesticks]
-        await self._handle_callback(kwargs.get('callback'), candlesticks)
+        return [Candlestick(symbol, cs) for cs in raw_candlesticks]
 
-        return candlesticks
+    def _get_candlesticks_range(self, interval, **kwargs):
+        """ Return the `(start_time, stop_time, limit)` of a klines
+        request, `stop_time` excluded, like the exchange would resolve it.
+        """
+
+        limit = kwargs.get('limit', 500)
+        now = self.clock.timestamp()
+        if kwargs.get('start_time') is not None:
+            start_time = kwargs['start_time']
+            # the first candlestick opened at or after `start_time`
+            first_open_time = add_intervals(interval,
+                    get_interval_start(interval, start_time - 1), 1)
+            end_time = kwargs.get('end_time', min(now,
+                    add_intervals(interval, first_open_time, limit) - 1))
+        else:
+            end_time = kwargs.get('end_time', now)
+            start_time = add_intervals(interval,
+                    get_interval_start(interval, end_time), 1 - limit)
+
+        return start_time, end_time + 1, limit
+
+    def _get_kline_pages(self, interval, start_time, stop_time,
+            limit=MAX_KLINES_LIMIT):
+        """ Split a time range into `(start_time, end_time)` pages of at
+        most `limit` candlesticks.
+        """
+
+        page_span = limit * INTERVAL_MILLISECONDS[interval]
+        return [(page_start, min(page_start + page_span, stop_time) - 1)
+                for page_start in range(start_time, stop_time, page_span)]
+
+    def _store_candlesticks(self, series, candlesticks, start_time, stop_time):
+        """ Store the closed candlesticks fetched for a range, and return
+        the ones that are still open.
+        """
+
+        closed_time = get_interval_start(series.interval, self.clock.timestamp())
+        rows = [get_candlestick_row(c) for c in candlesticks]
+        series.write([row for row in rows if row[0] < closed_time],
+                start_time, min(stop_time, closed_time))
+
+        return [c for c, row in zip(candlesticks, rows) if row[0] >= closed_time]
+
+    def _fill_kline_store(self, symbol, interval, start_time, stop_time):
+        """ Fetch the candlesticks between `start_time` and `stop_time`
+        that aren't in the kline store yet. Return the open candlesticks,
+        which aren't stored.
+        """
+
+        series = self.kline_store.get_series(symbol, interval)
+        open_candlesticks = []
+        for missing_start, missing_stop in series.missing(start_time, stop_time):
+            for page_start, page_end in self._get_kline_pages(
+                    interval, missing_start, missing_stop):
+                candlesticks = self._fetch_candlesticks(symbol, interval,
+                        start_time=page_start, end_time=page_end,
+                        limit=MAX_KLINES_LIMIT)
+                open_candlesticks += self._store_candlesticks(series,
+                        candlesticks, page_start, page_end + 1)
+
+        return open_candlesticks
+
+    async def _fill_kline_store_async(self, symbol, interval, start_time,
+            stop_time):
+        series = self.kline_store.get_series(symbol, interval)
+        open_candlesticks = []
+        for missing_start, missing_stop in series.missing(start_time, stop_time):
+            pages = self._get_kline_pages(interval, missing_start, missing_stop)
+            # fetch a batch of pages at a time, and store each batch in
+            # one write, in order
+            for batch in range(0, len(pages), self.max_concurrency):
+                batch_pages = pages[batch:batch + self.max_concurrency]
+                results = await asyncio.gather(*(self._fetch_candlesticks_async(
+                        symbol, interval, start_time=page_start,
+                        end_time=page_end, limit=MAX_KLINES_LIMIT)
+                        for page_start, page_end in batch_pages))
+                open_candlesticks += self._store_candlesticks(series,
+                        [c for candlesticks in results for c in candlesticks],
+                        batch_pages[0][0], batch_pages[-1][1] + 1)
+
+        return open_candlesticks
+
+    def _get_stored_candlesticks(self, symbol, interval, start_time, stop_time,
+            limit, open_candlesticks, from_start):
+        """ Return the first `limit` candlesticks of the range if
+        `from_start`, else the last `limit`.
+        """
+
+        series = self.kline_store.get_series(symbol, interval)
+        candlesticks = series.to_candlesticks(symbol, start_time, stop_time)
+        candlesticks += open_candlesticks
+
+        if from_start:
+            return candlesticks[:limit]
+        return candlesticks[-limit:]
+
+    def get_candlestick_columns(self, symbol, interval, start_time, end_time=None):
+        """ Return the closed candlesticks between `start_time` and
+        `end_time` (milliseconds) from the kline store as zero-copy
+        `binance.candles.CandlestickColumns`, fetching any that are
+        missing first.
+        """
+
+        self._logger('get_candlestick_columns').info(f'{symbol} {interval}')
+
+        stop_time = (self.clock.timestamp() if end_time is None else end_time) + 1
+        self._fill_kline_store(symbol, interval, start_time, stop_time)
+        return self.kline_store.get_series(symbol, interval).read(
+                start_time, stop_time)
+
+    async def get_candlestick_columns_async(self, symbol, interval, start_time,
+            end_time=None, **kwargs):
+        self._logger('get_candlestick_columns_async').info(f'{symbol} {interval}')
+
+        stop_time = (self.clock.timestamp() if end_time is None else end_time) + 1
+        await self._fill_kline_store_async(symbol, interval, start_time, stop_time)
+        columns = self.kline_store.get_series(symbol, interval).read(
+                start_time, stop_time)
+        await self._handle_callback(kwargs.get('callback'), columns)
+
+        return columns
         
+    async def iter_candlesticks_async(self, symbol, interval, start_time,
+            end_time=None, **kwargs):
+        """ Asynchronous iterator over every candlestick opened from
+        `start_time` to `end_time` inclusive (milliseconds), in time order.
+
+        The range is split into `limit`-sized pages and up to
+        `parallelism` pages are fetched ahead of the one being yielded.
+        If `checkpoint` is given, it is called with the open time of the
+        last candlestick of each page once that page has been yielded;
+        pass that value back as `resume_from` to continue after it.
+        """
+
+        logger = self._logger('iter_candlesticks_async')
+
+        limit = kwargs.get('limit', MAX_KLINES_LIMIT)
+        parallelism = kwargs.get('parallelism', 4)
+        checkpoint = kwargs.get('checkpoint')
+        if end_time is None:
+            end_time = self.clock.timestamp()
+        if kwargs.get('resume_from') is not None:
+            start_time = max(start_time, kwargs['resume_from'] + 1)
+        logger.info(f'{symbol} {interval} {start_time} - {end_time}')
+
+        windows = deque(self._get_kline_pages(interval, start_time,
+                end_time + 1, limit))
+
+        def _fetch_next_window():
+            page_start, page_end = windows.popleft()
+            return asyncio.ensure_future(self.get_candlesticks_async(
+                    symbol, interval, start_time=page_start,
+                    end_time=page_end, limit=limit))
+
+        pages = deque()
+        last_open_time = None
+        try:
+            while windows or pages:
+                while windows and len(pages) < parallelism:
+                    pages.append(_fetch_next_window())
+
+                candlesticks = await pages.popleft()
+                for candlestick in candlesticks:
+                    # pages can overlap by one candlestick at the edges
+                    if last_open_time and candlestick.open_time <= last_open_time:
+                        continue
+                    last_open_time = candlestick.open_time
+                    yield candlestick
+
+                if candlesticks:
+                    await self._handle_callback(checkpoint,
+                            int(last_open_time.timestamp() * 1000))
+        finally:
+            for page in pages:
+                page.cancel()
+
+    def iter_candlesticks(self, symbol, interval, start_time,
+            end_time=None, **kwargs):
+        """ Synchronous generator version of `iter_candlesticks_async()`.
+        """
+
+        candlesticks = self.iter_candlesticks_async(symbol, interval,
+                start_time, end_time, **kwargs)
+        try:
+            while True:
+                try:
+                    yield self._get_loop().run_until_complete(candlesticks.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._get_loop().run_until_complete(candlesticks.aclose())
+
+    async def _iter_many(self, fetches, concurrency=None):
+        """ Run `(key, coroutine function)` fetches concurrently and
+        yield `(key, result, error)` tuples as they complete.
+        """
+
+        semaphore = asyncio.Semaphore(concurrency or self.max_concurrency)
+
+        async def _fetch(key, fetch):
+            async with semaphore:
+                try:
+                    return key, await fetch(), None
+                except Exception as e:
+                    self._logger('_iter_many').error(f'{key}: {e}')
+                    return key, None, e
+
+        tasks = [asyncio.ensure_future(_fetch(key, fetch))
+                for key, fetch in fetches]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _get_many_async(self, fetches, concurrency=None):
+        results = {}
+        errors = {}
+        async for key, result, error in self._iter_many(fetches, concurrency):
+            if error is None:
+                results[key] = result
+            else:
+                errors[key] = error
+
+        return results, errors
+
+    def _get_depth_fetches(self, symbols):
+        return [(symbol, functools.partial(self.get_depth_async, symbol))
+                for symbol in symbols]
+
+    def iter_depth_many(self, symbols, **kwargs):
+        """ Asynchronous iterator of `(symbol, depth, error)` tuples,
+        in the order the fetches complete.
+        """
+
+        return self._iter_many(self._get_depth_fetches(symbols),
+                kwargs.get('concurrency'))
+
+    async def get_depth_many_async(self, symbols, **kwargs):
+        self._logger('get_depth_many_async').info(f'{len(symbols)} symbols')
+        return await self._get_many_async(self._get_depth_fetches(symbols),
+                kwargs.get('concurrency'))
+
+    def get_depth_many(self, symbols, **kwargs):
+        return self._get_loop().run_until_complete(
+                self.get_depth_many_async(symbols, **kwargs))
+
+    def _get_candlesticks_fetches(self, pairs, **kwargs):
+        return [((symbol, interval), functools.partial(
+                    self.get_candlesticks_async, symbol, interval, **kwargs))
+                for symbol, interval in pairs]
+
+    def iter_candlesticks_many(self, pairs, **kwargs):
+        """ Asynchronous iterator of `((symbol, interval), candlesticks, error)`
+        tuples, in the order the fetches complete.
+        """
+
+        concurrency = kwargs.pop('concurrency', None)
+        return self._iter_many(
+                self._get_candlesticks_fetches(pairs, **kwargs), concurrency)
+
+    async def get_candlesticks_many_async(self, pairs, **kwargs):
+        self._logger('get_candlesticks_many_async').info(f'{len(pairs)} pairs')
+
+        concurrency = kwargs.pop('concurrency', None)
+        return await self._get_many_async(
+                self._get_candlesticks_fetches(pairs, **kwargs), concurrency)
+
+    def get_candlesticks_many(self, pairs, **kwargs):
+        return self._get_loop().run_until_complete(
+                self.get_candlesticks_many_async(pairs, **kwargs))
+
     async def _handle_callback(self, callback, *values):
         if not callback:
             return
@@ -294,55 +1146,161 @@ class BinanceClient(GetLoggerMixin):
         else:
             logger.error(f'callback function {callback.__name__} must be a function or a coroutine, not "{type(callback).__name__}"')
 
+    def _get_candlestick_cache(self, symbol, interval, **kwargs):
+        cache = self.candlestick_cache.get((symbol, interval))
+        if cache is None:
+            if self.kline_store is not None:
+                kwargs['store'] = self.kline_store.get_series(symbol, interval)
+            cache = CandlestickCache(symbol, interval, **kwargs)
+            self.candlestick_cache[(symbol, interval)] = cache
+
+        return cache
+
+    def _get_candlesticks_event_handler(self, symbol, interval, handle):
+        logger = self._logger('_on_candlesticks_event')
+        cache = handle.cache
+
+        async def _on_candlesticks_event(event_dict):
+            logger.debug(f'{symbol} {interval} event: {event_dict["E"]}')
+            try:
+                cache.update(event_dict)
+            except Exception:
+                logger.exception(f'{symbol} {interval} failed to apply event')
+            self._backfill_candlesticks(symbol, interval, handle)
+
+            handle.publish(cache)
+            if hasattr(self, 'on_candlesticks_event'):
+                logger.debug('on_candlesticks_event')
+                await self.on_candlesticks_event(event_dict)
+
+        return _on_candlesticks_event
+
+    async def _get_initial_candlesticks_info(self, symbol, interval, handle):
+        logger = self._logger('_get_initial_candlesticks_info')
+
+        candlesticks = await self.get_candlesticks_async(symbol, interval)
+        handle.cache.set_initial_data(candlesticks)
+        self._backfill_candlesticks(symbol, interval, handle)
+        handle.ready.set()
+        logger.debug(f'{symbol} {interval} candlesticks ready')
+
+        if hasattr(self, 'on_candlesticks_ready'):
+            logger.debug('on_candlesticks_ready')
+            await self.on_candlesticks_ready()
+
+    def _backfill_candlesticks(self, symbol, interval, handle):
+        """ Refetch the candlesticks missing from the cache of `handle`
+        in the background, while the stream keeps updating it.
+        """
+
+        cache = handle.cache
+        if not cache.missing or handle.cancelled:
+            return
+
+        async def _backfill(start_time, end_time):
+            logger = self._logger('_backfill_candlesticks')
+            logger.info(f'{symbol} {interval} {start_time} - {end_time}')
+
+            # only the latest `capacity` candlesticks are kept
+            oldest_time = add_intervals(interval, get_interval_start(
+                    interval, end_time), 1 - cache.buffer.capacity)
+            candlesticks = [candlestick async for candlestick in
+                    self.iter_candlesticks_async(symbol, interval,
+                            max(start_time, oldest_time), end_time)]
+            cache.insert(candlesticks)
+
+        for start_time, end_time in cache.take_missing():
+            handle.add_task(_backfill(start_time, end_time))
+
+    async def start_candlesticks_stream(self, symbol, interval, **kwargs):
+        """ Start watching the `interval` candlesticks of `symbol` in
+        the background.
+
+        Return a `binance.streams.StreamHandle`; its `cache` is the
+        `CandlestickCache` for `(symbol, interval)`, holding the latest
+        `capacity` candlesticks.
+
+        The candlesticks of every longer interval in `aggregate` are
+        built locally from this stream, into `self.candlestick_cache`.
+        """
+
+        name = get_kline_stream_name(symbol, interval)
+        handle = self.stream_handles.get(name)
+        if handle is not None and not handle.cancelled:
+            return handle
+
+        self._logger('start_candlesticks_stream').info(f'{symbol} {interval}')
+        handle = StreamHandle(self.stream_manager, name,
+                self._get_candlestick_cache(symbol, interval, capacity=kwargs.get(
+                        'capacity', DEFAULT_CANDLESTICK_CAPACITY)))
+        self.stream_handles[name] = handle
+
+        for aggregate_interval in kwargs.get('aggregate', ()):
+            if (symbol, aggregate_interval) not in self.candlestick_cache:
+                self.candlestick_cache[(symbol, aggregate_interval)] = \
+                        handle.cache.aggregate(aggregate_interval)
+
+        await self.stream_manager.subscribe(name,
+                self._get_candlesticks_event_handler(symbol, interval, handle))
+        handle.add_task(self._get_initial_candlesticks_info(
+                symbol, interval, handle))
+        self.stream_manager.start()
+
+        return handle
+
+    async def stream_candlesticks(self, symbol, interval, **kwargs):
+        """ Asynchronous iterator over the `CandlestickCache` of
+        `(symbol, interval)`, yielded after every update once the
+        initial candlesticks are loaded.
+        """
+
+        handle = await self.start_candlesticks_stream(symbol, interval, **kwargs)
+        await handle.wait_ready()
+        async for cache in handle.events(kwargs.get('maxsize', 1)):
+            yield cache
+
     def watch_candlesticks(self, symbol, interval, **kwargs):
         self._logger('watch_candlesticks').info(f'{symbol} {interval}')
+        self.watch_many(candlesticks=[(symbol, interval)], **kwargs)
 
-        cache = self.candlestick_cache.get((symbol, interval))
-        if not cache:
-            cache = CandlestickCache()
-            self.candlestick_cache[(symbol, interval)] = cache
+    def watch_many(self, depth_symbols=(), candlesticks=(), **kwargs):
+        """ Watch the depth of every symbol in `depth_symbols` and the
+        candlesticks of every `(symbol, interval)` pair in `candlesticks`
+        over as few combined stream connections as possible.
+
+        Keyword arguments are passed on to `start_depth_stream()` and
+        `start_candlesticks_stream()`.
+        """
 
-        async def _watch_for_candlesticks_events():
-            logger = self._logger('_watch_for_candlestick_events')
-
-            url = KLINE_WEBSOCKET_URL.format(symbol=symbol.lower())
-            url += '_{}'.format(interval)
-            logger.debug(f'opening websocket connection: {url}')
-            async with ws.connect(url) as socket:
-                while True:
-                    event = await socket.recv()
-                    try:
-                        event_dict = json.loads(event)
-                        logger.debug(f'event: {event_dict["E"]}')
-                        cache.update(event_dict)
-                    except:
-                        pass
-
-                    if hasattr(self, 'on_candlesticks_event'):
-                        logger.debug('on_candlesticks_event')
-                        await self.on_candlesticks_event(event_dict)
-
-        async def _get_initial_candlesticks_info():
-            logger = self._logger('_get_initial_candlesticks_info')
-
-            candlesticks = await self.get_candlesticks_async(symbol, interval)
-            cache.set_initial_data(candlesticks)
-            logger.debug('candlesticks ready')
-
-            if hasattr(self, 'on_candlesticks_ready'):
-                logger.debug('on_candlesticks_ready')
-                await self.on_candlesticks_ready()
-
-        self._loop.run_until_complete(asyncio.gather(
-            _watch_for_candlesticks_events(),
-            _get_initial_candlesticks_info()
-        ))
+        logger = self._logger('watch_many')
+        logger.info(f'{len(depth_symbols)} depth, '
+                f'{len(candlesticks)} candlestick streams')
+
+        async def _watch():
+            for symbol in depth_symbols:
+                await self.start_depth_stream(symbol, **kwargs)
+            for symbol, interval in candlesticks:
+                await self.start_candlesticks_stream(symbol, interval, **kwargs)
+
+            await self.stream_manager.run()
+
+        self._get_loop().run_until_complete(_watch())
 
     def get_account_info(self):
         self._logger().info('get_account_info')
         raw_account = self._make_request(Endpoints.ACCOUNT_INFO, signed=True)
         return Account(raw_account)
 
+    async def get_account_info_async(self, **kwargs):
+        self._logger().info('get_account_info_async')
+        raw_account = await self._make_request_async(Endpoints.ACCOUNT_INFO,
+                signed=True)
+
+        account = Account(raw_account)
+        await self._handle_callback(kwargs.get('callback'), account)
+
+        return account
+
     def get_trade_info(self, symbol):
         self._logger('get_trade_info').info(symbol)
         raw_trades = self._make_request(Endpoints.TRADE_INFO,
@@ -350,6 +1308,16 @@ class BinanceClient(GetLoggerMixin):
 
         return [Trade(symbol, t) for t in raw_trades]
 
+    async def get_trade_info_async(self, symbol, **kwargs):
+        self._logger('get_trade_info_async').info(symbol)
+        raw_trades = await self._make_request_async(Endpoints.TRADE_INFO,
+                signed=True, params={'symbol' : symbol})
+
+        trades = [Trade(symbol, t) for t in raw_trades]
+        await self._handle_callback(kwargs.get('callback'), trades)
+
+        return trades
+
     def get_open_orders(self, symbol):
         self._logger('get_open_orders').info(symbol)
         raw_orders = self._make_request(Endpoints.OPEN_ORDERS,
@@ -357,6 +1325,16 @@ class BinanceClient(GetLoggerMixin):
 
         return [Order(o) for o in raw_orders]
 
+    async def get_open_orders_async(self, symbol, **kwargs):
+        self._logger('get_open_orders_async').info(symbol)
+        raw_orders = await self._make_request_async(Endpoints.OPEN_ORDERS,
+                signed=True, params={'symbol' : symbol})
+
+        orders = [Order(o) for o in raw_orders]
+        await self._handle_callback(kwargs.get('callback'), orders)
+
+        return orders
+
     def get_all_orders(self, symbol):
         self._logger('get_all_orders').info(symbol)
         raw_orders = self._make_request(Endpoints.ALL_ORDERS,
@@ -364,6 +1342,16 @@ class BinanceClient(GetLoggerMixin):
 
         return [Order(o) for o in raw_orders]
 
+    async def get_all_orders_async(self, symbol, **kwargs):
+        self._logger('get_all_orders_async').info(symbol)
+        raw_orders = await self._make_request_async(Endpoints.ALL_ORDERS,
+                signed=True, params={'symbol' : symbol})
+
+        orders = [Order(o) for o in raw_orders]
+        await self._handle_callback(kwargs.get('callback'), orders)
+
+        return orders
+
     def get_order_status(self, symbol, order_id):
         self._logger('get_order_status').info(f'{symbol}: {order_id}')
         raw_order = self._make_request(Endpoints.ORDER, signed=True,
@@ -371,6 +1359,16 @@ class BinanceClient(GetLoggerMixin):
         
         return Order(raw_order)
 
+    async def get_order_status_async(self, symbol, order_id, **kwargs):
+        self._logger('get_order_status_async').info(f'{symbol}: {order_id}')
+        raw_order = await self._make_request_async(Endpoints.ORDER, signed=True,
+                params={'symbol' : symbol, 'orderId' : order_id})
+
+        order = Order(raw_order)
+        await self._handle_callback(kwargs.get('callback'), order)
+
+        return order
+
     def cancel_order(self, symbol, order_id):
         self._logger('cancel_order').info(f'{symbol}: {order_id}')
         raw_order = self._make_request(Endpoints.ORDER, verb='delete', signed=True,
@@ -378,75 +1376,118 @@ class BinanceClient(GetLoggerMixin):
 
         return True
 
-    def place_market_buy(self, symbol, quantity, **kwargs):
-        self._logger('place_market_buy').info(f'{symbol}: {quantity}')
+    async def cancel_order_async(self, symbol, order_id, **kwargs):
+        self._logger('cancel_order_async').info(f'{symbol}: {order_id}')
+        await self._make_request_async(Endpoints.ORDER,
+                verb='delete', signed=True,
+                params={'symbol' : symbol, 'orderId' : order_id})
 
-        params = {
-            'symbol' : symbol,
-            'side' : OrderSides.BUY,
-            'type' : OrderTypes.MARKET,
-            'quantity' : quantity,
-            'recvWindow' : 60000
-        }
-        raw_order = self._make_request(Endpoints.ORDER,
-                verb='post', signed=True, params=params)
+        await self._handle_callback(kwargs.get('callback'), True)
 
-        return Order(raw_order)
+        return True
 
-    def place_market_sell(self, symbol, quantity, **kwargs):
-        self._logger('place_market_sell').info(f'{symbol}: {quantity}')
+    def _get_order_recv_window(self, **kwargs):
+        recv_window = kwargs.get('recv_window', self.recv_window)
+        if recv_window:
+            return recv_window
+        if self.clock.synced:
+            return DEFAULT_RECV_WINDOW
+        return UNSYNCED_ORDER_RECV_WINDOW
 
-        params = {
+    def _get_market_order_params(self, symbol, side, quantity, **kwargs):
+        return {
             'symbol' : symbol,
-            'side' : OrderSides.SELL,
+            'side' : side,
             'type' : OrderTypes.MARKET,
             'quantity' : quantity,
-            'recvWindow' : 60000
+            'recvWindow' : self._get_order_recv_window(**kwargs)
         }
-        raw_order = self._make_request(Endpoints.ORDER,
-                verb='post', signed=True, params=params)
-
-        return Order(raw_order)
-
-    def place_limit_buy(self, symbol, quantity, price, **kwargs):
-        self._logger('place_limit_buy').info(f'{symbol}: {quantity} @ {price}')
 
+    def _get_limit_order_params(self, symbol, side, quantity, price, **kwargs):
         params = {
             'symbol' : symbol,
-            'side' : OrderSides.BUY,
+            'side' : side,
             'type' : OrderTypes.LIMIT,
             'timeInForce' : kwargs.get('time_in_force', TimeInForce.GTC),
             'quantity' : quantity,
             'price' : price,
-            'recvWindow' : 60000
+            'recvWindow' : self._get_order_recv_window(**kwargs)
         }
         if 'stop_price' in kwargs:
             params['stopPrice'] = kwargs['stop_price']
 
+        return params
+
+    def _place_order(self, params):
         raw_order = self._make_request(Endpoints.ORDER,
                 verb='post', signed=True, params=params)
 
         return Order(raw_order)
 
+    async def _place_order_async(self, params, callback=None):
+        raw_order = await self._make_request_async(Endpoints.ORDER,
+                verb='post', signed=True, params=params)
+
+        order = Order(raw_order)
+        await self._handle_callback(callback, order)
+
+        return order
+
+    def place_market_buy(self, symbol, quantity, **kwargs):
+        self._logger('place_market_buy').info(f'{symbol}: {quantity}')
+        params = self._get_market_order_params(symbol, OrderSides.BUY,
+                quantity, **kwargs)
+
+        return self._place_order(params)
+
+    async def place_market_buy_async(self, symbol, quantity, **kwargs):
+        self._logger('place_market_buy_async').info(f'{symbol}: {quantity}')
+        params = self._get_market_order_params(symbol, OrderSides.BUY,
+                quantity, **kwargs)
+
+        return await self._place_order_async(params, kwargs.get('callback'))
+
+    def place_market_sell(self, symbol, quantity, **kwargs):
+        self._logger('place_market_sell').info(f'{symbol}: {quantity}')
+        params = self._get_market_order_params(symbol, OrderSides.SELL,
+                quantity, **kwargs)
+
+        return self._place_order(params)
+
+    async def place_market_sell_async(self, symbol, quantity, **kwargs):
+        self._logger('place_market_sell_async').info(f'{symbol}: {quantity}')
+        params = self._get_market_order_params(symbol, OrderSides.SELL,
+                quantity, **kwargs)
+
+        return await self._place_order_async(params, kwargs.get('callback'))
+
+    def place_limit_buy(self, symbol, quantity, price, **kwargs):
+        self._logger('place_limit_buy').info(f'{symbol}: {quantity} @ {price}')
+        params = self._get_limit_order_params(symbol, OrderSides.BUY,
+                quantity, price, **kwargs)
+
+        return self._place_order(params)
+
+    async def place_limit_buy_async(self, symbol, quantity, price, **kwargs):
+        self._logger('place_limit_buy_async').info(f'{symbol}: {quantity} @ {price}')
+        params = self._get_limit_order_params(symbol, OrderSides.BUY,
+                quantity, price, **kwargs)
+
+        return await self._place_order_async(params, kwargs.get('callback'))
+
     def place_limit_sell(self, symbol, quantity, price, **kwargs):
         self._logger('place_limit_sell').info(f'{symbol}: {quantity} @ {price}')
+        params = self._get_limit_order_params(symbol, OrderSides.SELL,
+                quantity, price, **kwargs)
 
-        params = {
-            'symbol' : symbol,
-            'side' : OrderSides.SELL,
-            'type' : OrderTypes.LIMIT,
-            'timeInForce' : kwargs.get('time_in_force', TimeInForce.GTC),
-            'quantity' : quantity,
-            'price' : price,
-            'recvWindow' : 60000
-        }
-        if 'stop_price' in kwargs:
-            params['stopPrice'] = kwargs['stop_price']
+        return self._place_order(params)
 
-        raw_order = self._make_request(Endpoints.ORDER,
-                verb='post', signed=True, params=params)
+    async def place_limit_sell_async(self, symbol, quantity, price, **kwargs):
+        self._logger('place_limit_sell_async').info(f'{symbol}: {quantity} @ {price}')
+        params = self._get_limit_order_params(symbol, OrderSides.SELL,
+                quantity, price, **kwargs)
 
-        return Order(raw_order)
+        return await self._place_order_async(params, kwargs.get('callback'))
 
     def withdraw(self, asset, amount, address, **kwargs):
         logger = self._logger('withdraw')
@@ -465,6 +1506,25 @@ class BinanceClient(GetLoggerMixin):
 
         return response['success']
 
+    async def withdraw_async(self, asset, amount, address, **kwargs):
+        logger = self._logger('withdraw_async')
+        logger.info(f'{amount} {asset} -> {address}')
+
+        params = {
+            'asset' : asset,
+            'amount' : amount,
+            'address' : address
+        }
+        response = await self._make_request_async(Endpoints.WITHDRAW,
+                verb='post', signed=True, params=params)
+        if not response.get('success'):
+            logger.error('failed request', extra=response)
+            return
+
+        await self._handle_callback(kwargs.get('callback'), response['success'])
+
+        return response['success']
+
     def get_withdraw_history(self, asset='', **kwargs):
         logger = self._logger('get_withdraw_history')
 
@@ -481,6 +1541,25 @@ class BinanceClient(GetLoggerMixin):
 
         return [Withdraw(withdraw) for withdraw in response['withdrawList']]
 
+    async def get_withdraw_history_async(self, asset='', **kwargs):
+        logger = self._logger('get_withdraw_history_async')
+
+        params = {}
+        if asset:
+            logger.info(asset)
+            params['asset'] = asset
+
+        response = await self._make_request_async(Endpoints.WITHDRAW_HISTORY,
+                verb='post', signed=True, params=params)
+        if not response.get('success'):
+            logger.error('failed request', extra=response)
+            return
+
+        withdraws = [Withdraw(withdraw) for withdraw in response['withdrawList']]
+        await self._handle_callback(kwargs.get('callback'), withdraws)
+
+        return withdraws
+
     def get_deposit_history(self, asset='', **kwargs):
         logger = self._logger('get_deposit_history')
 
@@ -495,6 +1574,28 @@ class BinanceClient(GetLoggerMixin):
             logger.error('failed request', extra=response)
             return
 
+        return self._get_deposits(response, asset)
+
+    async def get_deposit_history_async(self, asset='', **kwargs):
+        logger = self._logger('get_deposit_history_async')
+
+        params = {}
+        if asset:
+            logger.info(asset)
+            params['asset'] = asset
+
+        response = await self._make_request_async(Endpoints.DEPOSIT_HISTORY,
+                verb='post', signed=True, params=params)
+        if not response.get('success'):
+            logger.error('failed request', extra=response)
+            return
+
+        deposits = self._get_deposits(response, asset)
+        await self._handle_callback(kwargs.get('callback'), deposits)
+
+        return deposits
+
+    def _get_deposits(self, response, asset):
         """ TODO
         wait for API fix that enforces the `asset` parameter.
         Currently it does not, so filter out deposits after
@@ -520,6 +1621,14 @@ class BinanceClient(GetLoggerMixin):
           client.on_depth_event
             fires whenever a @depth websocket event is received.
 
+          client.on_depth_changes
+            fires with the symbol and the `binance.book.BookChanges`
+            whenever a @depth websocket event changes the book.
+
+          client.on_top_of_book
+            fires with the symbol and the depth cache whenever the best
+            bid or ask changes.
+
           client.on_candlesticks_ready
             fires when the initial /klines api call returns
 
@@ -0,0 +1,92 @@
+""" Server clock synchronization for the Binance API Client.
+"""
+
+
+import asyncio
+import time
+
+from .utils import GetLoggerMixin
+
+
+DEFAULT_SAMPLES = 5
+DEFAULT_SMOOTHING = 0.3
+DEFAULT_SYNC_INTERVAL = 60
+
+
+def local_time():
+    return time.time() * 1000
+
+
+class ServerClock(GetLoggerMixin):
+    """ Estimate of the offset between the local clock and the
+    Binance server clock, in milliseconds.
+
+    Each sync round takes a few `/time` samples and keeps the one with
+    the shortest round trip, assuming the server stamped it halfway
+    through. Rounds are smoothed with an exponential moving average.
+    """
+
+    __loggername__ = 'ServerClock'
+
+    def __init__(self, **kwargs):
+        self.samples = kwargs.get('samples', DEFAULT_SAMPLES)
+        self.smoothing = kwargs.get('smoothing', DEFAULT_SMOOTHING)
+
+        self.offset = 0
+        self.rtt = None
+        self.synced = False
+
+    def timestamp(self):
+        """ Return the current server time in milliseconds.
+        """
+
+        return int(local_time() + self.offset)
+
+    def add_sample(self, sent, server_time, received):
+        rtt = received - sent
+        offset = server_time - (sent + received) / 2
+
+        if self.synced:
+            self.offset += self.smoothing * (offset - self.offset)
+        else:
+            self.offset = offset
+            self.synced = True
+        self.rtt = rtt
+
+        self._logger('add_sample').debug(
+                f'offset: {self.offset:.1f}ms rtt: {rtt:.1f}ms')
+
+    def _add_best_sample(self, samples):
+        self.add_sample(*min(samples, key=lambda s: s[2] - s[0]))
+
+    def sync(self, client):
+        samples = []
+        for _ in range(self.samples):
+            sent = local_time()
+            server_time = client.get_server_time()
+            samples.append((sent, server_time, local_time()))
+
+        self._add_best_sample(samples)
+
+    async def sync_async(self, client):
+        samples = []
+        for _ in range(self.samples):
+            sent = local_time()
+            server_time = await client.get_server_time_async()
+            samples.append((sent, server_time, local_time()))
+
+        self._add_best_sample(samples)
+
+    async def run(self, client, interval=DEFAULT_SYNC_INTERVAL):
+        """ Resync every `interval` seconds until cancelled.
+        """
+
+        logger = self._logger('run')
+        while True:
+            try:
+                await self.sync_async(client)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f'clock sync failed: {e}')
+            await asyncio.sleep(interval)
@@ -39,3 +39,31 @@ class CandlestickIntervals:
     THREE_DAY = '3d'
     ONE_WEEK_ = '1w'
     ONE_MONTH = '1M'
+
+
+class RequestPriorities:
+    ORDER = 0
+    ACCOUNT = 1
+    MARKET_DATA = 2
+
+
+# approximate length of each interval, used to split time ranges into
+# pages. a month is counted as 28 days so a page never spans more than
+# `limit` monthly candlesticks.
+INTERVAL_MILLISECONDS = {
+    CandlestickIntervals.ONE_MINUTE : 60 * 1000,
+    CandlestickIntervals.THREE_MINUTE : 3 * 60 * 1000,
+    CandlestickIntervals.FIVE_MINUTE : 5 * 60 * 1000,
+    CandlestickIntervals.FIFTEEN_MINUTE : 15 * 60 * 1000,
+    CandlestickIntervals.THIRTY_MINUTE : 30 * 60 * 1000,
+    CandlestickIntervals.ONE_HOUR : 60 * 60 * 1000,
+    CandlestickIntervals.TWO_HOUR : 2 * 60 * 60 * 1000,
+    CandlestickIntervals.FOUR_HOUR : 4 * 60 * 60 * 1000,
+    CandlestickIntervals.SIX_HOUR : 6 * 60 * 60 * 1000,
+    CandlestickIntervals.EIGHT_HOUR : 8 * 60 * 60 * 1000,
+    CandlestickIntervals.TWELVE_HOUR : 12 * 60 * 60 * 1000,
+    CandlestickIntervals.ONE_DAY : 24 * 60 * 60 * 1000,
+    CandlestickIntervals.THREE_DAY : 3 * 24 * 60 * 60 * 1000,
+    CandlestickIntervals.ONE_WEEK_ : 7 * 24 * 60 * 60 * 1000,
+    CandlestickIntervals.ONE_MONTH : 28 * 24 * 60 * 60 * 1000,
+}
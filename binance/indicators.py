@@ -0,0 +1,299 @@
+""" Incremental technical indicators for the Binance API Client.
+
+Indicators are registered on a `binance.cache.CandlestickCache` with
+`add_indicator()`, and updated with every candlestick event in constant
+time. Their `value` always includes the open candlestick: closed
+candlesticks are folded into the indicator's state once, and the open
+one is only applied provisionally on top of that state.
+"""
+
+
+from collections import (
+    deque,
+    namedtuple,
+    )
+import math
+
+from .candles import CANDLESTICK_COLUMNS
+
+
+COLUMN_INDEXES = {name : index for index, (name, _) in enumerate(CANDLESTICK_COLUMNS)}
+HIGH = COLUMN_INDEXES['high']
+LOW = COLUMN_INDEXES['low']
+CLOSE = COLUMN_INDEXES['close']
+VOLUME = COLUMN_INDEXES['volume']
+QUOTE_ASSET_VOLUME = COLUMN_INDEXES['quote_asset_volume']
+
+BollingerBand = namedtuple('BollingerBand', ['lower', 'middle', 'upper'])
+
+
+class RollingSum:
+    """ The sum of the last `size` values added (all values if `size`
+    is None).
+
+    The sum is recomputed from the values every `size` removals, so
+    float error doesn't build up over a long stream.
+    """
+
+    def __init__(self, size=None):
+        self.size = size
+        self.values = deque()
+        self.total = 0
+        self.count = 0
+        self._removed = 0
+
+    def __len__(self):
+        return self.count if self.size is None else len(self.values)
+
+    def add(self, value):
+        if self.size is None:
+            # only the total is needed
+            self.total += value
+            self.count += 1
+            return
+
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+            self._removed += 1
+            if self._removed >= self.size:
+                self.total = sum(self.values)
+                self._removed = 0
+
+
+class Smoother:
+    """ Exponential smoothing with factor `alpha`, seeded with the
+    average of the first `period` values.
+    """
+
+    def __init__(self, period, alpha):
+        self.period = period
+        self.alpha = alpha
+        self.count = 0
+        self.total = 0
+        self.value = None
+
+    def add(self, value):
+        self.count += 1
+        if self.value is not None:
+            self.value += self.alpha * (value - self.value)
+            return
+
+        self.total += value
+        if self.count == self.period:
+            self.value = self.total / self.period
+
+    def peek(self, value):
+        """ Return what the smoothed value would be after adding `value`.
+        """
+
+        if self.value is not None:
+            return self.value + self.alpha * (value - self.value)
+        if self.count == self.period - 1:
+            return (self.total + value) / self.period
+        return None
+
+
+class Indicator:
+    """ Base class of incremental indicators.
+
+    Subclasses implement `_commit(row)` to fold a closed candlestick row
+    into their state, and `_compute(row)` to return the value with `row`
+    as the open candlestick, without changing their state.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self._live = None
+
+    def load(self, rows):
+        self.reset()
+        for row in rows:
+            self.update(row)
+
+    def update(self, row):
+        """ Apply a new or updated candlestick row.
+        """
+
+        live = self._live
+        if live is not None:
+            if row[0] < live[0]:
+                return
+            if row[0] > live[0]:
+                self._commit(live)
+        self._live = row
+        self.value = self._compute(row)
+
+    def _commit(self, row):
+        raise NotImplementedError
+
+    def _compute(self, row):
+        raise NotImplementedError
+
+
+class SMA(Indicator):
+    """ Simple moving average of the last `period` closes.
+    """
+
+    def __init__(self, period, column='close'):
+        self.period = period
+        self.column = COLUMN_INDEXES[column]
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self._window = RollingSum(self.period - 1)
+
+    def _commit(self, row):
+        self._window.add(row[self.column])
+
+    def _compute(self, row):
+        if len(self._window) < self.period - 1:
+            return None
+        return (self._window.total + row[self.column]) / self.period
+
+
+class EMA(Indicator):
+    """ Exponential moving average of the closes, seeded with the simple
+    average of the first `period` closes.
+    """
+
+    def __init__(self, period, column='close'):
+        self.period = period
+        self.column = COLUMN_INDEXES[column]
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self._smoother = Smoother(self.period, 2 / (self.period + 1))
+
+    def _commit(self, row):
+        self._smoother.add(row[self.column])
+
+    def _compute(self, row):
+        return self._smoother.peek(row[self.column])
+
+
+class RSI(Indicator):
+    """ Relative strength index with Wilder's smoothing, from 0 to 100.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self._gains = Smoother(self.period, 1 / self.period)
+        self._losses = Smoother(self.period, 1 / self.period)
+        self._last_close = None
+
+    def _commit(self, row):
+        close = row[CLOSE]
+        if self._last_close is not None:
+            change = close - self._last_close
+            self._gains.add(max(change, 0))
+            self._losses.add(max(-change, 0))
+        self._last_close = close
+
+    def _compute(self, row):
+        if self._last_close is None:
+            return None
+
+        change = row[CLOSE] - self._last_close
+        gain = self._gains.peek(max(change, 0))
+        loss = self._losses.peek(max(-change, 0))
+        if gain is None:
+            return None
+        if not loss:
+            return 100.0 if gain else 50.0
+        return 100 - 100 / (1 + gain / loss)
+
+
+class ATR(Indicator):
+    """ Average true range with Wilder's smoothing.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self._ranges = Smoother(self.period, 1 / self.period)
+        self._last_close = None
+
+    def _get_true_range(self, row):
+        high, low = row[HIGH], row[LOW]
+        if self._last_close is None:
+            return high - low
+        return max(high, self._last_close) - min(low, self._last_close)
+
+    def _commit(self, row):
+        self._ranges.add(self._get_true_range(row))
+        self._last_close = row[CLOSE]
+
+    def _compute(self, row):
+        return self._ranges.peek(self._get_true_range(row))
+
+
+class VWAP(Indicator):
+    """ Volume weighted average price of the last `period` candlesticks
+    (every candlestick since the indicator was loaded if `period` is
+    None), from their quote asset and base asset volumes.
+    """
+
+    def __init__(self, period=None):
+        self.period = period
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        size = None if self.period is None else self.period - 1
+        self._quote_volume = RollingSum(size)
+        self._volume = RollingSum(size)
+
+    def _commit(self, row):
+        self._quote_volume.add(row[QUOTE_ASSET_VOLUME])
+        self._volume.add(row[VOLUME])
+
+    def _compute(self, row):
+        volume = self._volume.total + row[VOLUME]
+        if not volume:
+            return None
+        return (self._quote_volume.total + row[QUOTE_ASSET_VOLUME]) / volume
+
+
+class BollingerBands(Indicator):
+    """ The simple moving average of the last `period` closes, and
+    `deviations` standard deviations above and below it.
+    """
+
+    def __init__(self, period=20, deviations=2):
+        self.period = period
+        self.deviations = deviations
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self._closes = RollingSum(self.period - 1)
+        self._squares = RollingSum(self.period - 1)
+
+    def _commit(self, row):
+        close = row[CLOSE]
+        self._closes.add(close)
+        self._squares.add(close * close)
+
+    def _compute(self, row):
+        if len(self._closes) < self.period - 1:
+            return None
+
+        close = row[CLOSE]
+        mean = (self._closes.total + close) / self.period
+        variance = (self._squares.total + close * close) / self.period - mean * mean
+        width = self.deviations * math.sqrt(max(variance, 0))
+        return BollingerBand(mean - width, mean, mean + width)
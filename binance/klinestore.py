@@ -0,0 +1,251 @@
+""" On-disk candlestick storage for the Binance API Client.
+"""
+
+
+from array import array
+from bisect import (
+    bisect_left,
+    bisect_right,
+    )
+import json
+import mmap
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .candles import (
+    CANDLESTICK_COLUMNS,
+    CandlestickColumns,
+    )
+from .enums import CandlestickIntervals
+from .storage import Candlestick
+from .utils import GetLoggerMixin
+
+
+INDEX_FILE = 'index.json'
+
+
+def get_interval_directory(interval):
+    # '1m' and '1M' are the same directory on case-insensitive file systems
+    if interval == CandlestickIntervals.ONE_MONTH:
+        return '1mo'
+    return interval
+
+
+class KlineSeries(GetLoggerMixin):
+    """ The stored candlesticks of one symbol and interval.
+
+    Each column is a file of packed values, ordered by open time, and
+    memory-mapped for reading, so `read()` returns zero-copy slices of
+    the files (numpy arrays if numpy is installed, memoryviews
+    otherwise). `index.json` keeps the time ranges that have been
+    fetched, so ranges without any candlesticks (e.g. exchange
+    downtime) aren't fetched again.
+    """
+
+    __loggername__ = 'KlineSeries'
+
+    def __init__(self, path, interval):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.interval = interval
+
+        self._index_path = os.path.join(path, INDEX_FILE)
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                self.coverage = [tuple(r) for r in json.load(f)]
+        else:
+            self.coverage = []
+
+        self._views = None
+
+    def _get_column_path(self, name):
+        return os.path.join(self.path, f'{name}.bin')
+
+    def _get_views(self):
+        """ Map every column file, up to the length of the shortest one
+        (an interrupted write can leave some columns longer).
+        """
+
+        if self._views is not None:
+            return self._views
+
+        buffers = []
+        for name, typecode in CANDLESTICK_COLUMNS:
+            path = self._get_column_path(name)
+            if os.path.exists(path) and os.path.getsize(path):
+                with open(path, 'rb') as f:
+                    # the map stays valid after the file is closed
+                    buffers.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                buffers.append(array(typecode))
+
+        views = []
+        for buffer, (_, typecode) in zip(buffers, CANDLESTICK_COLUMNS):
+            if np is not None:
+                views.append(np.frombuffer(buffer, dtype=typecode))
+            else:
+                views.append(memoryview(buffer).cast('B').cast(typecode))
+
+        length = min(len(view) for view in views)
+        self._views = [view[:length] for view in views]
+        return self._views
+
+    def __len__(self):
+        return len(self._get_views()[0])
+
+    def _get_slice(self, start_time=None, end_time=None):
+        open_times = self._get_views()[0]
+        search = bisect_left if np is None else \
+                lambda values, value: int(np.searchsorted(values, value))
+        start = 0 if start_time is None else search(open_times, start_time)
+        stop = len(open_times) if end_time is None else \
+                search(open_times, end_time)
+        return start, max(start, stop)
+
+    def read(self, start_time=None, end_time=None):
+        """ Return zero-copy `binance.candles.CandlestickColumns` of the
+        stored candlesticks opened from `start_time` up to, but not
+        including, `end_time` (milliseconds).
+        """
+
+        start, stop = self._get_slice(start_time, end_time)
+        return CandlestickColumns(*(view[start:stop] for view in self._get_views()))
+
+    def rows(self, start_time=None, end_time=None):
+        start, stop = self._get_slice(start_time, end_time)
+        views = self._get_views()
+        for index in range(start, stop):
+            yield tuple(view[index].item() if np is not None else view[index]
+                    for view in views)
+
+    def tail(self, n, end_time=None):
+        """ Return the last `n` rows opened before `end_time`.
+        """
+
+        start, stop = self._get_slice(None, end_time)
+        views = self._get_views()
+        return [tuple(view[index].item() if np is not None else view[index]
+                for view in views) for index in range(max(start, stop - n), stop)]
+
+    def to_candlesticks(self, symbol, start_time=None, end_time=None):
+        return [Candlestick(symbol, list(row))
+                for row in self.rows(start_time, end_time)]
+
+    def is_covered(self, timestamp):
+        index = bisect_right(self.coverage, (timestamp, float('inf'))) - 1
+        return index >= 0 and timestamp < self.coverage[index][1]
+
+    def missing(self, start_time, end_time):
+        """ Return the `(start_time, end_time)` ranges between `start_time`
+        and `end_time` that haven't been stored.
+        """
+
+        missing = []
+        for covered_start, covered_end in self.coverage:
+            if covered_end <= start_time:
+                continue
+            if covered_start >= end_time:
+                break
+            if covered_start > start_time:
+                missing.append((start_time, covered_start))
+            start_time = max(start_time, covered_end)
+        if start_time < end_time:
+            missing.append((start_time, end_time))
+
+        return missing
+
+    def _add_coverage(self, start_time, end_time):
+        coverage = []
+        for covered_start, covered_end in sorted(
+                self.coverage + [(start_time, end_time)]):
+            if coverage and covered_start <= coverage[-1][1]:
+                coverage[-1] = (coverage[-1][0], max(coverage[-1][1], covered_end))
+            else:
+                coverage.append((covered_start, covered_end))
+        self.coverage = coverage
+
+        temp_path = self._index_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(coverage, f)
+        os.replace(temp_path, self._index_path)
+
+    def write(self, rows, start_time, end_time):
+        """ Store closed candlestick rows, and mark the range from
+        `start_time` to `end_time` they were fetched for as stored.
+        Rows in ranges that are already stored are skipped, since closed
+        candlesticks don't change.
+        """
+
+        rows = sorted(row for row in rows if not self.is_covered(row[0]))
+        if rows:
+            open_times = self._get_views()[0]
+            if not len(open_times) or rows[0][0] > open_times[-1]:
+                self._append(rows)
+            else:
+                self._merge(rows)
+
+        if start_time < end_time:
+            self._add_coverage(start_time, end_time)
+
+    def _append(self, rows):
+        length = len(self)
+        for index, (name, typecode) in enumerate(CANDLESTICK_COLUMNS):
+            with open(self._get_column_path(name), 'r+b' if os.path.exists(
+                    self._get_column_path(name)) else 'wb') as f:
+                # drop values left over from an interrupted write
+                f.truncate(length * array(typecode).itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(array(typecode, [row[index] for row in rows]).tobytes())
+
+        # remapped on the next read; views already handed out keep
+        # the old maps alive
+        self._views = None
+
+    def _merge(self, rows):
+        """ Splice `rows` into the columns, replacing stored rows with the
+        same open time. Only the stored rows within the time span of
+        `rows` are unpacked; the rows before and after it are copied as
+        packed bytes.
+        """
+
+        self._logger('_merge').info(f'{self.path}: merging {len(rows)} rows')
+
+        start, stop = self._get_slice(rows[0][0], rows[-1][0] + 1)
+        if start < stop:
+            merged = {row[0] : row for row in self.rows(rows[0][0], rows[-1][0] + 1)}
+            merged.update((row[0], row) for row in rows)
+            rows = [merged[open_time] for open_time in sorted(merged)]
+
+        views = self._get_views()
+        for index, (name, typecode) in enumerate(CANDLESTICK_COLUMNS):
+            temp_path = self._get_column_path(name) + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(views[index][:start])
+                f.write(array(typecode, [row[index] for row in rows]).tobytes())
+                f.write(views[index][stop:])
+            # open maps keep reading the replaced file
+            os.replace(temp_path, self._get_column_path(name))
+
+        self._views = None
+
+
+class KlineStore:
+    """ A directory of `KlineSeries`, one per symbol and interval.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._series = {}
+
+    def get_series(self, symbol, interval):
+        series = self._series.get((symbol, interval))
+        if series is None:
+            series = KlineSeries(os.path.join(self.path, symbol.upper(),
+                    get_interval_directory(interval)), interval)
+            self._series[(symbol, interval)] = series
+
+        return series
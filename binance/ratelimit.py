@@ -0,0 +1,237 @@
+""" Client-side request weight limiter for the Binance API Client.
+"""
+
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from .enums import RequestPriorities
+from .utils import GetLoggerMixin
+
+
+DEFAULT_WEIGHT_LIMIT = 1200
+DEFAULT_WEIGHT_INTERVAL = 60
+DEFAULT_ORDER_LIMIT = 10
+DEFAULT_ORDER_INTERVAL = 1
+
+# how often a queued request that isn't at the front of the
+# queue checks whether it has moved up
+POLL_INTERVAL = 0.05
+
+USED_WEIGHT_HEADERS = ('X-MBX-USED-WEIGHT-1M', 'X-MBX-USED-WEIGHT')
+
+
+class FixedWindow:
+    """ Usage counted in fixed windows of `interval` seconds, aligned to
+    the clock like the exchange's (e.g. every UTC minute). Usage only
+    resets when the next window starts.
+    """
+
+    def __init__(self, limit, interval):
+        self.limit = limit
+        self.interval = interval
+        self.used = 0
+        self.window_start = 0
+
+    def roll(self, now):
+        window_start = now - now % self.interval
+        if window_start > self.window_start:
+            self.window_start = window_start
+            self.used = 0
+
+    @property
+    def remaining(self):
+        return max(0, self.limit - self.used)
+
+    def time_until(self, amount, now):
+        # a request heavier than the whole limit goes out on its own
+        if self.used + amount <= self.limit or not self.used:
+            return 0
+        return self.window_start + self.interval - now
+
+    def consume(self, amount):
+        self.used += amount
+
+    def set_used(self, used):
+        # requests still in flight aren't counted by the server yet
+        self.used = max(self.used, used)
+
+
+class RateLimiter(GetLoggerMixin):
+    """ Request weight scheduler shared by the sync and async request
+    paths.
+
+    Weight and orders are counted in the same fixed windows as the
+    exchange's, and synced with the usage the server reports. Requests
+    wait in a single priority queue, so when the budget is tight, lower
+    `RequestPriorities` values (orders) are let through before higher
+    ones (market data). One limiter can be shared by several clients
+    that use the same IP address.
+    """
+
+    __loggername__ = 'RateLimiter'
+
+    def __init__(self, **kwargs):
+        self.weights = FixedWindow(
+                kwargs.get('weight_limit', DEFAULT_WEIGHT_LIMIT),
+                kwargs.get('weight_interval', DEFAULT_WEIGHT_INTERVAL))
+        self.orders = FixedWindow(
+                kwargs.get('order_limit', DEFAULT_ORDER_LIMIT),
+                kwargs.get('order_interval', DEFAULT_ORDER_INTERVAL))
+
+        self._condition = threading.Condition()
+        self._queue = []
+        self._counter = itertools.count()
+        self._paused_until = 0
+
+    def _enqueue(self, priority, is_async):
+        ticket = (priority, next(self._counter), threading.get_ident(), is_async)
+        with self._condition:
+            heapq.heappush(self._queue, ticket)
+
+        return ticket
+
+    def _dequeue(self, ticket):
+        with self._condition:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+            self._condition.notify_all()
+
+    def _is_next(self, ticket):
+        """ Return whether `ticket` is next in line.
+
+        A sync request blocks its thread, so it never waits behind the
+        async requests of that thread: their event loop can't run
+        until it returns.
+        """
+
+        _, _, thread, is_async = ticket
+        if is_async:
+            return self._queue[0] == ticket
+        return ticket == min(t for t in self._queue
+                if not (t[3] and t[2] == thread))
+
+    def _try_acquire(self, ticket, weight, orders):
+        """ Return 0 if the request may be sent now, otherwise the
+        number of seconds to wait before trying again.
+
+        Must be called with `self._condition` held.
+        """
+
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if not self._is_next(ticket):
+            return POLL_INTERVAL
+
+        now = time.time()
+        self.weights.roll(now)
+        self.orders.roll(now)
+        delay = max(self.weights.time_until(weight, now),
+                self.orders.time_until(orders, now))
+        if delay:
+            return delay
+
+        self.weights.consume(weight)
+        self.orders.consume(orders)
+        self._queue.remove(ticket)
+        heapq.heapify(self._queue)
+        self._condition.notify_all()
+
+        return 0
+
+    def acquire(self, weight=1, orders=0, priority=RequestPriorities.MARKET_DATA):
+        ticket = self._enqueue(priority, False)
+        try:
+            with self._condition:
+                while True:
+                    delay = self._try_acquire(ticket, weight, orders)
+                    if not delay:
+                        return
+                    self._condition.wait(delay)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+
+    async def acquire_async(self, weight=1, orders=0,
+            priority=RequestPriorities.MARKET_DATA):
+        ticket = self._enqueue(priority, True)
+        try:
+            while True:
+                with self._condition:
+                    delay = self._try_acquire(ticket, weight, orders)
+                if not delay:
+                    return
+                await asyncio.sleep(delay)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+
+    def update(self, headers, sent=None):
+        """ Sync the weight budget with the usage the server reports.
+        `sent` is the `time.time()` the request was sent at: usage
+        reported for a window that has since ended is ignored.
+        """
+
+        for header in USED_WEIGHT_HEADERS:
+            used = headers.get(header)
+            if used is not None:
+                with self._condition:
+                    self.weights.roll(time.time())
+                    if sent is None or sent >= self.weights.window_start:
+                        self.weights.set_used(int(used))
+                return
+
+    def pause(self, seconds):
+        """ Hold every queued request for `seconds`, e.g. after a 429
+        response with a `Retry-After` header.
+        """
+
+        self._logger('pause').warning(f'pausing requests for {seconds}s')
+        with self._condition:
+            self._paused_until = max(self._paused_until,
+                    time.monotonic() + seconds)
+
+
+class SnapshotScheduler(GetLoggerMixin):
+    """ Stagger order book snapshot requests.
+
+    After a mass disconnect every book needs a fresh snapshot at once.
+    Used as an async context manager, this lets at most `max_concurrency`
+    snapshots run at a time and spaces their starts at least `interval`
+    seconds apart, with some jitter.
+    """
+
+    __loggername__ = 'SnapshotScheduler'
+
+    def __init__(self, max_concurrency=2, interval=0.25):
+        self.max_concurrency = max_concurrency
+        self.interval = interval
+
+        # bound to the event loop it was created on
+        self._semaphore = None
+        self._semaphore_loop = None
+        self._next_start = 0
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        await self._semaphore.acquire()
+
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + self.interval * random.uniform(1, 1.5)
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def __aexit__(self, *exc_info):
+        # the semaphore was replaced if another loop used the scheduler
+        if self._semaphore_loop is asyncio.get_running_loop():
+            self._semaphore.release()
@@ -6,6 +6,11 @@ from .enums import (
     OrderTypes,
     )
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 class Ticker:
     def __init__(self, raw_ticker):
@@ -16,6 +21,57 @@ class Ticker:
         return deepcopy(self.__dict__)
 
 
+class TickerTable:
+    """ Prices of many symbols, indexed by symbol.
+
+    Lookups are dictionary lookups. If numpy is installed, the prices
+    are also kept in `price_vector`, where the price of a symbol is at
+    `index[symbol]`. Refreshing with `update()` overwrites the prices in
+    place, so references to the vector stay valid while the set of
+    symbols doesn't change.
+    """
+
+    def __init__(self, raw_tickers=()):
+        self.prices = {}
+        self.index = {}
+        self.price_vector = None
+        self.update(raw_tickers)
+
+    def update(self, raw_tickers):
+        new_symbols = False
+        for raw_ticker in raw_tickers:
+            symbol = raw_ticker['symbol']
+            if symbol not in self.index:
+                self.index[symbol] = len(self.index)
+                new_symbols = True
+            self.prices[symbol] = float(raw_ticker['price'])
+
+        if np is None:
+            return
+        if new_symbols or self.price_vector is None:
+            self.price_vector = np.empty(len(self.index))
+        for symbol, price in self.prices.items():
+            self.price_vector[self.index[symbol]] = price
+
+    def __getitem__(self, symbol):
+        return self.prices[symbol]
+
+    def __contains__(self, symbol):
+        return symbol in self.prices
+
+    def __len__(self):
+        return len(self.prices)
+
+    def get(self, symbol, default=None):
+        return self.prices.get(symbol, default)
+
+    def ticker(self, symbol):
+        return Ticker({'symbol' : symbol, 'price' : self.prices[symbol]})
+
+    def to_json(self):
+        return deepcopy(self.prices)
+
+
 class Account:
     def __init__(self, raw_account):
         self.maker_commission = raw_account['makerCommission']
@@ -99,6 +155,24 @@ class Trade:
         return deepcopy(self.__dict__)
 
 
+class SymbolInfo:
+    def __init__(self, raw_symbol):
+        self.symbol = raw_symbol['symbol']
+        self.status = raw_symbol['status']
+        self.base_asset = raw_symbol['baseAsset']
+        self.quote_asset = raw_symbol['quoteAsset']
+
+        # keep the sizes as strings so they can be parsed exactly
+        filters = {f['filterType']: f for f in raw_symbol.get('filters', [])}
+        self.tick_size = filters.get('PRICE_FILTER', {}).get('tickSize')
+        self.step_size = filters.get('LOT_SIZE', {}).get('stepSize')
+        self.min_quantity = filters.get('LOT_SIZE', {}).get('minQty')
+        self.min_notional = filters.get('MIN_NOTIONAL', {}).get('minNotional')
+
+    def to_json(self):
+        return deepcopy(self.__dict__)
+
+
 class Depth:
     def __init__(self, symbol, raw_depth):
         self.symbol = symbol
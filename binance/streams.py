@@ -0,0 +1,428 @@
+""" Combined websocket streams for the Binance API Client.
+"""
+
+
+import asyncio
+from collections import deque
+import json
+import random
+import time
+
+import websockets as ws
+
+from .utils import (
+    GetLoggerMixin,
+    json_loads,
+    )
+
+
+COMBINED_STREAM_URL = 'wss://stream.binance.com:9443/stream?streams={}'
+DEPTH_STREAM = '{symbol}@depth'
+KLINE_STREAM = '{symbol}@kline_{interval}'
+
+# binance accepts up to 1024 streams per connection. stay well under
+# that so the connection URL stays a reasonable length.
+DEFAULT_MAX_STREAMS_PER_CONNECTION = 200
+
+# seconds to wait before reconnecting, doubled after every failed attempt
+DEFAULT_MIN_BACKOFF = 1
+DEFAULT_MAX_BACKOFF = 60
+
+# binance drops connections that send more than 5 messages per second,
+# pings and pongs included. leave room for those.
+DEFAULT_MAX_MESSAGES_PER_SECOND = 4
+
+
+def get_depth_stream_name(symbol):
+    return DEPTH_STREAM.format(symbol=symbol.lower())
+
+
+def get_kline_stream_name(symbol, interval):
+    return KLINE_STREAM.format(symbol=symbol.lower(), interval=interval)
+
+
+class StreamConnection(GetLoggerMixin):
+    """ One websocket connection carrying several combined streams.
+
+    Each frame is routed to the handler registered for its stream name.
+    Streams added or removed while the connection is open are
+    (un)subscribed on the live connection, batched into one message per
+    loop tick and throttled to the exchange's message limit. A stream's
+    `subscribed` event is set once the exchange sends its events, and
+    cleared when the connection drops. A dropped connection is
+    reopened with exponential backoff, and every stream's reconnect
+    callback is called once it is back, since events may have been lost.
+    """
+
+    __loggername__ = 'StreamConnection'
+
+    def __init__(self, **kwargs):
+        self.min_backoff = kwargs.get('min_backoff', DEFAULT_MIN_BACKOFF)
+        self.max_backoff = kwargs.get('max_backoff', DEFAULT_MAX_BACKOFF)
+        self.max_messages_per_second = kwargs.get('max_messages_per_second',
+                DEFAULT_MAX_MESSAGES_PER_SECOND)
+
+        self.handlers = {}
+        self.reconnect_handlers = {}
+        self.subscribed_events = {}
+        self.socket = None
+        self.task = None
+        self._message_id = 0
+        self._received = False
+        self._pending = {'SUBSCRIBE' : [], 'UNSUBSCRIBE' : []}
+        # message id -> streams waiting for their SUBSCRIBE response
+        self._subscribing = {}
+        self._flush_task = None
+        self._sent_times = deque(maxlen=self.max_messages_per_second)
+
+    def __len__(self):
+        return len(self.handlers)
+
+    @property
+    def url(self):
+        return COMBINED_STREAM_URL.format('/'.join(self.handlers))
+
+    async def _throttle(self):
+        """ Wait until another message fits in the last second.
+        """
+
+        if len(self._sent_times) == self._sent_times.maxlen:
+            delay = self._sent_times[0] + 1 - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self._sent_times.append(time.monotonic())
+
+    async def _send_method(self, method, names):
+        if self.socket is None:
+            return
+
+        await self._throttle()
+        if self.socket is None:
+            return
+
+        self._message_id += 1
+        if method == 'SUBSCRIBE':
+            self._subscribing[self._message_id] = list(names)
+        await self.socket.send(json.dumps({
+            'method' : method,
+            'params' : list(names),
+            'id' : self._message_id
+        }))
+
+    async def add(self, name, handler, on_reconnect=None, subscribed=None):
+        added = name in self.handlers
+        self.handlers[name] = handler
+        if on_reconnect is not None:
+            self.reconnect_handlers[name] = on_reconnect
+        if subscribed is not None:
+            self.subscribed_events[name] = subscribed
+        if not added:
+            self._queue_method('SUBSCRIBE', name)
+
+    async def remove(self, name):
+        self.reconnect_handlers.pop(name, None)
+        subscribed = self.subscribed_events.pop(name, None)
+        if subscribed is not None:
+            subscribed.clear()
+        if self.handlers.pop(name, None) is not None:
+            self._queue_method('UNSUBSCRIBE', name)
+
+    def _queue_method(self, method, name):
+        """ Queue a stream to be (un)subscribed by the next flush.
+        """
+
+        # the next connection subscribes from `handlers`
+        if self.socket is None:
+            return
+
+        opposite = 'UNSUBSCRIBE' if method == 'SUBSCRIBE' else 'SUBSCRIBE'
+        if name in self._pending[opposite]:
+            # added and removed again before the flush
+            self._pending[opposite].remove(name)
+            if method == 'SUBSCRIBE':
+                self._set_subscribed([name])
+            return
+
+        self._pending[method].append(name)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush())
+
+    def _set_subscribed(self, names):
+        for name in names:
+            subscribed = self.subscribed_events.get(name)
+            if subscribed is not None:
+                subscribed.set()
+
+    def _on_response(self, frame):
+        names = self._subscribing.pop(frame.get('id'), None)
+        if names is None:
+            return
+
+        if frame.get('error') is not None:
+            self._logger('_on_response').error(
+                    f'failed to subscribe to {names}: {frame["error"]}')
+            return
+
+        self._set_subscribed(name for name in names if name in self.handlers)
+
+    async def _flush(self):
+        # let streams added in the same tick share a message
+        await asyncio.sleep(0)
+        while self.socket is not None and any(self._pending.values()):
+            for method in ('UNSUBSCRIBE', 'SUBSCRIBE'):
+                names, self._pending[method] = self._pending[method], []
+                if names:
+                    await self._send_method(method, names)
+
+    async def run(self):
+        logger = self._logger('run')
+
+        backoff = self.min_backoff
+        reconnecting = False
+        while self.handlers:
+            self._received = False
+            try:
+                await self._receive(reconnecting)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f'connection lost: {e!r}')
+
+            # only back off if the connection never got going
+            backoff = self.min_backoff if self._received else \
+                    min(backoff * 2, self.max_backoff)
+            delay = backoff * random.uniform(0.5, 1)
+            logger.info(f'reconnecting in {delay:.1f}s')
+            await asyncio.sleep(delay)
+            reconnecting = True
+
+    async def _receive(self, reconnecting):
+        """ Receive frames until the connection drops. `_received` is
+        set once any frame is received.
+        """
+
+        logger = self._logger('_receive')
+
+        url = self.url
+        subscribed = set(self.handlers)
+        logger.debug(f'opening websocket connection: {url}')
+        async with ws.connect(url) as socket:
+            self.socket = socket
+            self._pending = {'SUBSCRIBE' : [], 'UNSUBSCRIBE' : []}
+            self._subscribing = {}
+            try:
+                # streams in the URL are sent from the start
+                self._set_subscribed(name for name in subscribed
+                        if name in self.handlers)
+
+                # streams added while the connection was opening
+                missing = set(self.handlers) - subscribed
+                if missing:
+                    await self._send_method('SUBSCRIBE', missing)
+
+                if reconnecting:
+                    for name, on_reconnect in list(self.reconnect_handlers.items()):
+                        try:
+                            await on_reconnect()
+                        except Exception:
+                            logger.exception(f'{name} reconnect handler failed')
+
+                while True:
+                    frame = json_loads(await socket.recv())
+                    self._received = True
+
+                    # (un)subscribe responses have no stream name
+                    if 'stream' not in frame:
+                        self._on_response(frame)
+                        continue
+
+                    handler = self.handlers.get(frame['stream'])
+                    if handler is None:
+                        continue
+
+                    try:
+                        await handler(frame['data'])
+                    except Exception:
+                        logger.exception(f'{frame["stream"]} handler failed')
+            except ws.ConnectionClosed as e:
+                logger.warning(f'connection closed: {e!r}')
+            finally:
+                self.socket = None
+                if self._flush_task is not None:
+                    self._flush_task.cancel()
+                for subscribed in self.subscribed_events.values():
+                    subscribed.clear()
+
+
+class StreamHandle(GetLoggerMixin):
+    """ A running subscription to one stream and the cache it feeds.
+
+    Iterate over `events()` to receive the cache after every update.
+    `cancel()` unsubscribes the stream and ends every iterator.
+    """
+
+    __loggername__ = 'StreamHandle'
+
+    def __init__(self, manager, name, cache):
+        self.manager = manager
+        self.name = name
+        self.cache = cache
+        self.cancelled = False
+        self.last_event_id = None
+        self.resyncing = False
+
+        self.ready = asyncio.Event()
+        # set while the exchange sends the stream's events. every event
+        # after that is buffered until the initial data is loaded.
+        self.subscribed = asyncio.Event()
+        self._tasks = []
+        self._queues = []
+
+    def add_task(self, coro):
+        task = asyncio.ensure_future(coro)
+        task.add_done_callback(self._on_task_done)
+        self._tasks.append(task)
+
+        return task
+
+    def _on_task_done(self, task):
+        self._tasks.remove(task)
+        if not task.cancelled() and task.exception() is not None:
+            self._logger('_on_task_done').error(
+                    f'{self.name}: {task.exception()!r}')
+
+    def publish(self, value):
+        for queue in self._queues:
+            # slow consumers skip to the latest values
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(value)
+
+    async def events(self, maxsize=1):
+        """ Asynchronous iterator over published values, until the
+        stream is cancelled. With the default `maxsize` of 1, a slow
+        consumer only sees the latest value.
+        """
+
+        queue = asyncio.Queue(maxsize)
+        self._queues.append(queue)
+        try:
+            while not self.cancelled:
+                value = await queue.get()
+                if value is StreamHandle:
+                    return
+                yield value
+        finally:
+            self._queues.remove(queue)
+
+    async def wait_ready(self):
+        await self.ready.wait()
+        return self.cache
+
+    async def cancel(self):
+        if self.cancelled:
+            return
+
+        self.cancelled = True
+        await self.manager.unsubscribe(self.name)
+        for task in list(self._tasks):
+            task.cancel()
+        for queue in self._queues:
+            # wake up waiting iterators so they can return
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(StreamHandle)
+
+
+class StreamManager(GetLoggerMixin):
+    """ Pack stream subscriptions into as few combined stream
+    connections as the exchange allows.
+    """
+
+    __loggername__ = 'StreamManager'
+
+    def __init__(self, **kwargs):
+        self.max_streams_per_connection = kwargs.get(
+                'max_streams_per_connection', DEFAULT_MAX_STREAMS_PER_CONNECTION)
+        self.min_backoff = kwargs.get('min_backoff', DEFAULT_MIN_BACKOFF)
+        self.max_backoff = kwargs.get('max_backoff', DEFAULT_MAX_BACKOFF)
+
+        self.connections = []
+        self.streams = {}
+        self._running = False
+        self._stopped = None
+
+    def _get_connection(self):
+        for connection in self.connections:
+            if len(connection) < self.max_streams_per_connection:
+                return connection
+
+        connection = StreamConnection(
+                min_backoff=self.min_backoff,
+                max_backoff=self.max_backoff)
+        self.connections.append(connection)
+        return connection
+
+    def _start(self, connection):
+        if connection.task is None or connection.task.done():
+            connection.task = asyncio.ensure_future(connection.run())
+            connection.task.add_done_callback(self._on_connection_done)
+
+    def _on_connection_done(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            self._logger('_on_connection_done').error(
+                    f'connection closed: {task.exception()!r}')
+
+    async def subscribe(self, name, handler, on_reconnect=None,
+            subscribed=None):
+        """ Route events of stream `name` to the `handler` coroutine
+        function. `on_reconnect` is awaited after the stream's
+        connection is reopened. The `subscribed` event, if any, is set
+        while the exchange sends the stream's events.
+        """
+
+        connection = self.streams.get(name)
+        if connection is None:
+            connection = self._get_connection()
+            self.streams[name] = connection
+
+        self._logger('subscribe').debug(name)
+        await connection.add(name, handler, on_reconnect, subscribed)
+        if self._running:
+            self._start(connection)
+
+    async def unsubscribe(self, name):
+        connection = self.streams.pop(name, None)
+        if connection is None:
+            return
+
+        self._logger('unsubscribe').debug(name)
+        await connection.remove(name)
+        if not len(connection):
+            if connection.task is not None:
+                connection.task.cancel()
+            self.connections.remove(connection)
+
+    def start(self):
+        self._running = True
+        for connection in self.connections:
+            if len(connection):
+                self._start(connection)
+
+    def stop(self):
+        self._running = False
+        for connection in self.connections:
+            if connection.task is not None:
+                connection.task.cancel()
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def run(self):
+        """ Start every connection and wait until `stop()` is called.
+        """
+
+        if self._stopped is None:
+            self._stopped = asyncio.Event()
+
+        self.start()
+        await self._stopped.wait()
@@ -0,0 +1,71 @@
+""" Fixed-point tick arithmetic for the Binance API Client.
+"""
+
+
+from decimal import Decimal
+
+
+class TickScale:
+    """ Convert prices or quantities to integer multiples of a tick
+    (a symbol's tick size or step size) and back.
+
+    Integers hash, compare and add exactly, so they make cheap and
+    exact order book keys. Converting back to `Decimal` or `float` is
+    only needed at the edges.
+    """
+
+    def __init__(self, tick_size):
+        if tick_size is None:
+            raise ValueError('tick size is required')
+
+        tick_size = Decimal(str(tick_size)).normalize()
+        if tick_size <= 0:
+            raise ValueError(f'invalid tick size: {tick_size}')
+
+        self.tick_size = tick_size
+        self.decimals = max(0, -tick_size.as_tuple().exponent)
+        self.factor = 10 ** self.decimals
+        # the tick in units of 10 ** -decimals
+        self.tick = int(tick_size * self.factor)
+
+    def __repr__(self):
+        return f'TickScale({str(self.tick_size)!r})'
+
+    def _parse_units(self, value):
+        """ Parse a decimal string into an integer number of
+        10 ** -decimals units, without going through float.
+        """
+
+        whole, _, fraction = value.partition('.')
+        extra = fraction[self.decimals:]
+        if extra.strip('0'):
+            raise ValueError(f'{value} has more decimals than {self.tick_size}')
+
+        fraction = fraction[:self.decimals].ljust(self.decimals, '0')
+        units = int(whole.lstrip('-') + fraction)
+        return -units if whole.startswith('-') else units
+
+    def to_ticks(self, value):
+        """ Return `value` as a number of ticks.
+
+        Strings are converted exactly; a `ValueError` is raised if they
+        aren't a multiple of the tick size. Floats are rounded to the
+        nearest tick.
+        """
+
+        if isinstance(value, str):
+            ticks, remainder = divmod(self._parse_units(value), self.tick)
+            if remainder:
+                raise ValueError(f'{value} is not a multiple of {self.tick_size}')
+            return ticks
+
+        return int(round(value * self.factor / self.tick))
+
+    def to_decimal(self, ticks):
+        return Decimal(ticks * self.tick).scaleb(-self.decimals)
+
+    def to_float(self, ticks):
+        return ticks * self.tick / self.factor
+
+    def to_string(self, ticks):
+        return str(self.to_decimal(ticks))
@@ -3,6 +3,29 @@ import logging
 from pprint import pprint
 import time
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+JSON_BACKENDS = {'json' : json.loads}
+if ujson is not None:
+    JSON_BACKENDS['ujson'] = ujson.loads
+if orjson is not None:
+    JSON_BACKENDS['orjson'] = orjson.loads
+
+# fastest installed backend first
+for json_backend in ('orjson', 'ujson', 'json'):
+    if json_backend in JSON_BACKENDS:
+        _json_loads = JSON_BACKENDS[json_backend]
+        break
+
 
 class GetLoggerMixin:
     ''' Adds a `_logger()` classmethod that returns the correctly
@@ -23,3 +46,23 @@ def pp(o):
         print(json.dumps(o, indent=2, sort_keys=True))
     except:
         pprint(o)
+
+
+def set_json_backend(name):
+    ''' Choose the library used to decode API responses and
+    websocket events: 'orjson', 'ujson', or 'json'.
+    '''
+
+    global json_backend, _json_loads
+
+    if name not in JSON_BACKENDS:
+        raise ValueError(f'json backend not installed: {name}')
+    json_backend = name
+    _json_loads = JSON_BACKENDS[name]
+
+
+def json_loads(data):
+    ''' Decode a JSON `str` or `bytes` with the selected backend.
+    '''
+
+    return _json_loads(data)
@@ -0,0 +1,131 @@
+""" Benchmark how many depth events per second DepthCache can apply.
+
+Compares the order book engine against the previous implementation,
+which rebuilt both sides of the book on every event.
+"""
+
+
+from argparse import ArgumentParser
+import random
+import time
+
+from binance.cache import DepthCache
+from binance.storage import (
+    Ask,
+    Bid,
+    Depth,
+    )
+
+
+TICK = 0.01
+MID_PRICE = 10000.0
+
+
+def format_level(price, quantity):
+    return [f'{price:.2f}', f'{quantity:.6f}']
+
+
+def get_snapshot(levels):
+    return Depth('BTCUSDT', {
+        'lastUpdateId' : 0,
+        'bids' : [format_level(MID_PRICE - TICK * i, 1) for i in range(1, levels + 1)],
+        'asks' : [format_level(MID_PRICE + TICK * i, 1) for i in range(1, levels + 1)]
+    })
+
+
+def get_events(number, levels, changes):
+    """ Events that mostly touch levels near the top of the book, with
+    some levels removed and some new levels added.
+    """
+
+    rng = random.Random(0)
+
+    def get_levels(side):
+        raw_levels = []
+        for _ in range(changes):
+            distance = min(int(rng.expovariate(0.05)) + 1, levels)
+            price = MID_PRICE + side * TICK * distance
+            quantity = 0 if rng.random() < 0.2 else rng.random() * 5
+            raw_levels.append(format_level(price, quantity))
+        return raw_levels
+
+    return [{'U' : i, 'u' : i, 'b' : get_levels(-1), 'a' : get_levels(1)}
+            for i in range(1, number + 1)]
+
+
+class LegacyDepthCache:
+    """ The list based book before the order book engine.
+    """
+
+    def __init__(self, depth):
+        self.bids = depth.bids
+        self.asks = depth.asks
+
+    def update(self, event):
+        event_bids = {bid.price: bid for bid in map(Bid, event['b'])}
+        event_asks = {ask.price: ask for ask in map(Ask, event['a'])}
+
+        updated_bids = []
+        for bid in self.bids:
+            event_bid = event_bids.get(bid.price)
+            if not event_bid:
+                updated_bids.append(bid)
+            elif not event_bid.quantity:
+                continue
+            else:
+                updated_bids.append(event_bid)
+        self.bids = updated_bids
+
+        updated_asks = []
+        for ask in self.asks:
+            event_ask = event_asks.get(ask.price)
+            if not event_ask:
+                updated_asks.append(ask)
+            elif not event_ask.quantity:
+                continue
+            else:
+                updated_asks.append(event_ask)
+        self.asks = updated_asks
+
+
+def events_per_second(cache, events):
+    start = time.perf_counter()
+    for event in events:
+        cache.update(event)
+    return len(events) / (time.perf_counter() - start)
+
+
+def main():
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument('-n', '--number', type=int, default=20000,
+            help='apply <NUMBER> depth events.')
+    arg_parser.add_argument('-l', '--levels', type=int, default=1000,
+            help='start with <LEVELS> price levels on each side.')
+    arg_parser.add_argument('-c', '--changes', type=int, default=10,
+            help='change <CHANGES> levels per side in each event.')
+    args = arg_parser.parse_args()
+
+    snapshot = get_snapshot(args.levels)
+    events = get_events(args.number, args.levels, args.changes)
+
+    before = events_per_second(LegacyDepthCache(snapshot), events)
+
+    cache = DepthCache()
+    cache.set_initial_data(snapshot)
+    after = events_per_second(cache, events)
+
+    start = time.perf_counter()
+    for _ in range(args.number):
+        cache.book.top(20)
+        cache.book.best_bid()
+        cache.book.best_ask()
+    reads = args.number / (time.perf_counter() - start)
+
+    print(f'before: {before:10.0f} events/s')
+    print(f' after: {after:10.0f} events/s')
+    print(f'speedup: {after / before:.1f}x')
+    print(f'top(20) + best bid/ask: {reads:10.0f} reads/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+""" Benchmark how many signed order requests can be built per second.
+
+Compares the request building path of the client against the previous
+implementation, which rebuilt the HMAC key and sorted the parameters on
+every request.
+"""
+
+
+from argparse import ArgumentParser
+import hashlib
+import hmac
+import time
+import timeit
+from urllib.parse import quote
+
+from binance import BinanceClient
+from binance.client import (
+    API_BASE_URL,
+    Endpoints,
+    )
+from binance.enums import (
+    OrderSides,
+    OrderTypes,
+    TimeInForce,
+    )
+
+
+APIKEY = 'x' * 64
+APISECRET = 'y' * 64
+
+
+def get_order_params():
+    return {
+        'symbol' : 'ETHBTC',
+        'side' : OrderSides.BUY,
+        'type' : OrderTypes.LIMIT,
+        'timeInForce' : TimeInForce.GTC,
+        'quantity' : 1.5,
+        'price' : 0.0712,
+        'recvWindow' : 5000
+    }
+
+
+def legacy_sign_request(path, params):
+    """ The request building path before the pre-keyed HMAC.
+    """
+
+    url = '{}/{}'.format(API_BASE_URL, path)
+
+    params['timestamp'] = int(round(time.time() * 1000.0))
+    if 'recvWindow' not in params: params['recvWindow'] = 6000
+
+    sorted_parameters = []
+    for param in sorted(params.keys()):
+        url_encoded_value = quote(str(params[param]))
+        sorted_parameters.append('{}={}'.format(param, url_encoded_value))
+    query_string = '&'.join(sorted_parameters)
+
+    signature = hmac.new(APISECRET.encode(), digestmod=hashlib.sha256)
+    signature.update(query_string.encode())
+
+    return '{}?{}&signature={}'.format(
+            url, query_string, signature.hexdigest())
+
+
+def requests_per_second(function, number):
+    seconds = min(timeit.repeat(function, number=number, repeat=5))
+    return number / seconds
+
+
+def main():
+    arg_parser = ArgumentParser()
+    arg_parser.add_argument('-n', '--number', type=int, default=20000,
+            help='sign <NUMBER> requests per round.')
+    args = arg_parser.parse_args()
+
+    client = BinanceClient(APIKEY, APISECRET, rate_limiter=None)
+
+    before = requests_per_second(
+            lambda: legacy_sign_request(Endpoints.ORDER, get_order_params()),
+            args.number)
+    after = requests_per_second(
+            lambda: client._prepare_request(Endpoints.ORDER, 'post',
+                get_order_params(), True),
+            args.number)
+
+    print(f'before: {before:10.0f} signed requests/s')
+    print(f' after: {after:10.0f} signed requests/s')
+    print(f'speedup: {after / before:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
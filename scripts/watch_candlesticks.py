@@ -47,7 +47,7 @@ def main():
         """ This coroutine runs whenever a @candlesticks websocket event is received.
         """
         cache = client.candlestick_cache[(symbol, interval)]
-        latest_candlestick = cache.candlesticks[-1]
+        latest_candlestick = cache.latest()
         date_string = latest_candlestick.open_time.strftime('%Y-%m-%d %H:%M:%S')
         event_date_string = datetime.fromtimestamp(event['E'] / 1000)
         print(f'UPDATE {event_date_string}\n')
@@ -55,7 +55,7 @@ def main():
         print(f'      open: {latest_candlestick.price.open}')
         print(f'      high: {latest_candlestick.price.high}')
         print(f'       low: {latest_candlestick.price.low}')
-        print(f'     close: {latest_candlestick.price.low}')
+        print(f'     close: {latest_candlestick.price.close}')
         print(f'    volume: {latest_candlestick.volume}')
         print()
 
@@ -39,11 +39,14 @@ def main():
         client.depth_cache[symbol].pretty_print(depth_limit)
     
     @client.event
-    async def on_depth_event(event):
-        """ This coroutine runs whenever a @depth websocket event is received.
+    async def on_depth_changes(symbol, changes):
+        """ This coroutine runs whenever a @depth websocket event changes
+        the book. Only reprint the book if a level on screen changed.
         """
-        print(f'update id: {event["u"]}') # print the event id
-        client.depth_cache[symbol].pretty_print(depth_limit)
+        cache = client.depth_cache[symbol]
+        if cache.changes_within(changes, depth_limit):
+            print(f'update id: {cache.last_update_id}') # print the event id
+            cache.pretty_print(depth_limit)
 
     client.watch_depth(symbol)
 
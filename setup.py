@@ -26,6 +26,11 @@ install_requires = [
 test_requires = [
     'pytest',
 ]
+extras_require = {
+    'speedups': [
+        'orjson',
+    ],
+}
 
 data_files = [
     ('', ['README.md', 'CHANGES.md', 'VERSION']),
@@ -34,6 +39,8 @@ entry_points = {
     'console_scripts': [
         'watchdepth = scripts.watch_depth:main',
         'watchcandlesticks = scripts.watch_candlesticks:main',
+        'benchmarksigning = scripts.benchmark_signing:main',
+        'benchmarkbook = scripts.benchmark_book:main',
     ]
 }
 
@@ -47,6 +54,7 @@ setup(name='binance',
       setup_requires=setup_requires,
       install_requires=install_requires,
       test_requires=test_requires,
+      extras_require=extras_require,
       packages=find_packages(),
       data_files=data_files,
       include_package_data=True,
@@ -0,0 +1,52 @@
+""" Offline test suite for the Binance API Client.
+"""
+
+
+import asyncio
+
+import pytest
+
+from binance.client import BinanceClient
+from binance.ratelimit import SnapshotScheduler
+
+
+#@pytest.mark.skip
+def test_loop_bound_resources_follow_the_running_loop():
+    client = BinanceClient('apikey', 'apisecret')
+    scheduler = SnapshotScheduler(1, interval=0)
+
+    async def get_resources():
+        async with scheduler:
+            pass
+        return (client._get_async_session(), client._get_request_semaphore(),
+                scheduler._semaphore)
+
+    first = asyncio.run(get_resources())
+    second = asyncio.run(get_resources())
+    for old, new in zip(first, second):
+        assert new is not old
+    # the session of the closed loop was closed
+    assert first[0].closed
+
+    # the sync wrappers get a loop of their own if needed
+    assert not client._get_loop().is_closed()
+    client.close()
+    assert second[0].closed
+
+
+#@pytest.mark.skip
+def test_candlesticks_range_steps_calendar_months():
+    client = BinanceClient('apikey', 'apisecret')
+    # 2018-06-15 UTC
+    end_time = 1529020800000
+
+    start_time, stop_time, limit = client._get_candlesticks_range('1M',
+            end_time=end_time, limit=12)
+    # 2017-07-01 UTC, twelve monthly candlesticks up to june 2018
+    assert (start_time, stop_time, limit) == (1498867200000, end_time + 1, 12)
+
+    start_time, stop_time, _ = client._get_candlesticks_range('1M',
+            start_time=1498867200000, limit=12)
+    # the close of june 2018
+    assert stop_time == 1530403200000
+    client.close()
@@ -0,0 +1,96 @@
+""" Test suite for the server clock synchronization.
+"""
+
+
+import asyncio
+
+import pytest
+
+from binance import clock
+from binance.client import (
+    BinanceClient,
+    DEFAULT_RECV_WINDOW,
+    UNSYNCED_ORDER_RECV_WINDOW,
+    )
+from binance.clock import ServerClock
+from binance.enums import OrderSides
+
+
+class FakeServer:
+    """ Answers `/time` requests, and advances the local clock by each
+    request's round trip.
+    """
+
+    def __init__(self, monkeypatch, samples):
+        # (round trip, server time) per request
+        self.samples = list(samples)
+        self.now = 1000
+        monkeypatch.setattr(clock, 'local_time', lambda: self.now)
+
+    def get_server_time(self):
+        rtt, server_time = self.samples.pop(0)
+        self.now += rtt
+        return server_time
+
+    async def get_server_time_async(self):
+        return self.get_server_time()
+
+
+#@pytest.mark.skip
+def test_server_clock_sample_arithmetic(monkeypatch):
+    server_clock = ServerClock()
+    server_clock.add_sample(1000, 1600, 1100)
+    assert server_clock.rtt == 100
+    # stamped halfway through the round trip
+    assert server_clock.offset == 550
+    assert server_clock.synced
+
+    monkeypatch.setattr(clock, 'local_time', lambda: 2000.4)
+    assert server_clock.timestamp() == 2550
+
+
+#@pytest.mark.skip
+def test_server_clock_keeps_lowest_rtt_sample(monkeypatch):
+    server = FakeServer(monkeypatch, [
+        (300, 5000),
+        (20, 5400),
+        (100, 5000),
+    ])
+    server_clock = ServerClock(samples=3)
+    server_clock.sync(server)
+
+    # the second request was sent at 1300 and received at 1320
+    assert server_clock.rtt == 20
+    assert server_clock.offset == 5400 - 1310
+
+
+#@pytest.mark.skip
+def test_server_clock_smooths_offsets(monkeypatch):
+    server = FakeServer(monkeypatch, [(10, 1505), (10, 1715)])
+    server_clock = ServerClock(samples=1, smoothing=0.5)
+
+    server_clock.sync(server)
+    assert server_clock.offset == 500
+
+    asyncio.run(server_clock.sync_async(server))
+    # a new offset of 700 is only folded in halfway
+    assert server_clock.offset == 600
+
+
+#@pytest.mark.skip
+def test_order_recv_window_follows_clock_sync():
+    client = BinanceClient('apikey', 'apisecret')
+
+    def get_recv_window(**kwargs):
+        return client._get_market_order_params('ETHBTC', OrderSides.BUY,
+                1, **kwargs)['recvWindow']
+
+    assert get_recv_window() == UNSYNCED_ORDER_RECV_WINDOW
+    assert get_recv_window(recv_window=2000) == 2000
+
+    client.clock.add_sample(1000, 1050, 1100)
+    assert get_recv_window() == DEFAULT_RECV_WINDOW
+
+    client.recv_window = 3000
+    assert get_recv_window() == 3000
+    client.close()
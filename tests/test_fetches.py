@@ -76,6 +76,20 @@ def test_get_ticker_invalid():
         assert False
 
 
+#@pytest.mark.skip
+def test_get_ticker_table():
+    table = CLIENT.get_ticker_table()
+
+    assert isinstance(table, TickerTable)
+    for symbol in SYMBOLS:
+        assert symbol in table
+        assert isinstance(table[symbol], float)
+        assert_ticker(table.ticker(symbol))
+
+    assert CLIENT.get_ticker_table(table) is table
+    assert len(table) == len(table.index)
+
+
 def assert_candlestick(candlestick):
     assert isinstance(candlestick, Candlestick)
     assert isinstance(candlestick.price, CandlestickPrice)
@@ -127,6 +141,43 @@ def test_get_candlesticks_async():
     os.remove('candlesticks.json')
 
 
+#@pytest.mark.skip
+def test_iter_candlesticks():
+    symbol = random.choice(SYMBOLS)
+    end_time = CLIENT.get_server_time()
+    start_time = end_time - 1000 * 60 * 60 * 24 * 3
+
+    checkpoints = []
+    candlesticks = list(CLIENT.iter_candlesticks(symbol,
+            CandlestickIntervals.FIVE_MINUTE, start_time, end_time,
+            limit=100, checkpoint=checkpoints.append))
+
+    assert len(candlesticks) >= 12 * 24 * 3
+    assert len(checkpoints) == 9
+    for previous, candlestick in zip(candlesticks, candlesticks[1:]):
+        assert candlestick.open_time > previous.open_time
+    for candlestick in candlesticks:
+        assert candlestick.symbol == symbol
+        assert_candlestick(candlestick)
+
+    resumed = list(CLIENT.iter_candlesticks(symbol,
+            CandlestickIntervals.FIVE_MINUTE, start_time, end_time,
+            limit=100, resume_from=checkpoints[4]))
+    assert [c.open_time for c in resumed] == \
+            [c.open_time for c in candlesticks[500:]]
+
+
+#@pytest.mark.skip
+def test_get_symbol_info():
+    symbol = random.choice(SYMBOLS)
+    symbol_info = CLIENT.get_symbol_info(symbol)
+
+    assert isinstance(symbol_info, SymbolInfo)
+    assert symbol_info.symbol == symbol
+    assert float(symbol_info.tick_size) > 0
+    assert float(symbol_info.step_size) > 0
+
+
 def assert_depth(depth):
     assert isinstance(depth, Depth)
     assert isinstance(depth.update_id, int)
@@ -184,6 +235,31 @@ def test_get_depth_data_async():
     os.remove('depth.json')
 
 
+#@pytest.mark.skip
+def test_get_depth_many():
+    depths, errors = CLIENT.get_depth_many(SYMBOLS + ['DOGE'])
+
+    assert set(depths) == set(SYMBOLS)
+    assert set(errors) == {'DOGE'}
+    for symbol, depth in depths.items():
+        assert depth.symbol == symbol
+        assert_depth(depth)
+
+
+#@pytest.mark.skip
+def test_get_candlesticks_many():
+    pairs = [(symbol, CandlestickIntervals.ONE_HOUR) for symbol in SYMBOLS]
+    candlesticks, errors = CLIENT.get_candlesticks_many(pairs, limit=10)
+
+    assert not errors
+    assert set(candlesticks) == set(pairs)
+    for (symbol, interval), symbol_candlesticks in candlesticks.items():
+        assert len(symbol_candlesticks) == 10
+        for candlestick in symbol_candlesticks:
+            assert candlestick.symbol == symbol
+            assert_candlestick(candlestick)
+
+
 #@pytest.mark.skip
 def test_get_account_info():
     account = CLIENT.get_account_info()
@@ -0,0 +1,65 @@
+""" Test suite for the on-disk kline store.
+"""
+
+
+import pytest
+
+from binance.klinestore import KlineStore
+
+
+MINUTE = 60000
+
+
+def get_row(open_time, close):
+    return (open_time, 1.0, close, 1.0, close, 10.0,
+            open_time + MINUTE - 1, 10.0, 5, 4.0, 4.0)
+
+
+#@pytest.mark.skip
+def test_kline_store_write_and_read(tmp_path):
+    series = KlineStore(str(tmp_path)).get_series('ETHBTC', '1m')
+    assert series.missing(0, 10 * MINUTE) == [(0, 10 * MINUTE)]
+
+    series.write([get_row(t * MINUTE, t) for t in range(5)], 0, 5 * MINUTE)
+    series.write([get_row(t * MINUTE, t) for t in range(7, 9)],
+            7 * MINUTE, 9 * MINUTE)
+    assert series.missing(0, 10 * MINUTE) == \
+            [(5 * MINUTE, 7 * MINUTE), (9 * MINUTE, 10 * MINUTE)]
+
+    columns = series.read(2 * MINUTE, 8 * MINUTE)
+    assert list(columns.open_time) == [2 * MINUTE, 3 * MINUTE, 4 * MINUTE, 7 * MINUTE]
+    assert list(columns.close) == [2.0, 3.0, 4.0, 7.0]
+
+    # filling a hole rewrites the columns in order
+    series.write([get_row(5 * MINUTE, 5.0)], 5 * MINUTE, 7 * MINUTE)
+    assert series.missing(0, 9 * MINUTE) == []
+    assert [row[0] for row in series.tail(3)] == [5 * MINUTE, 7 * MINUTE, 8 * MINUTE]
+
+    # rows already stored are skipped, and the store survives a reopen
+    series.write([get_row(0, 9.0)], 0, MINUTE)
+    reopened = KlineStore(str(tmp_path)).get_series('ETHBTC', '1m')
+    assert len(reopened) == 8
+    assert reopened.read(0, MINUTE).close[0] == 0.0
+    assert reopened.missing(0, 9 * MINUTE) == []
+    assert reopened.to_candlesticks('ETHBTC', 8 * MINUTE)[0].price.close == 8.0
+
+
+#@pytest.mark.skip
+def test_kline_store_splices_rows(tmp_path):
+    series = KlineStore(str(tmp_path)).get_series('ETHBTC', '1m')
+    series.write([get_row(t * MINUTE, t) for t in range(10, 15)],
+            10 * MINUTE, 15 * MINUTE)
+    # stored without coverage, e.g. after an interrupted write
+    series.write([get_row(5 * MINUTE, 0.0)], 0, 0)
+
+    # older history, overlapping the uncovered row
+    series.write([get_row(t * MINUTE, t) for t in range(3, 7)],
+            3 * MINUTE, 7 * MINUTE)
+    series.write([get_row(t * MINUTE, t) for t in range(7, 10)],
+            7 * MINUTE, 10 * MINUTE)
+
+    columns = series.read()
+    assert list(columns.open_time) == [t * MINUTE for t in range(3, 15)]
+    assert list(columns.close) == [float(t) for t in range(3, 15)]
+    assert list(columns.trades) == [5] * 12
+    assert series.missing(0, 15 * MINUTE) == [(0, 3 * MINUTE)]